@@ -1,28 +1,27 @@
-import { safeJSONParse } from '@/utils'
 import { createDocumentResource } from 'frappe-ui'
 import { computed, reactive } from 'vue'
 import { getFormattedResult } from '@/utils/query/results'
 
 export default function useQueryResults(result_name) {
 	const resource = getResultResource(result_name)
-	resource.get.fetch()
+	resource.fetchResults.submit()
 	return reactive({
-		reload: () => resource.get.fetch(),
-		loading: computed(() => resource.loading),
-		data: computed(() => resource.doc?.results || []),
-		columns: computed(() => resource.doc?.results?.[0] || []),
-		formattedResults: computed(() => getFormattedResult(resource.doc?.results)),
+		reload: () => resource.fetchResults.submit(),
+		loading: computed(() => resource.fetchResults.loading),
+		data: computed(() => resource.fetchResults.data || []),
+		columns: computed(() => resource.fetchResults.data?.[0] || []),
+		formattedResults: computed(() => getFormattedResult(resource.fetchResults.data)),
 	})
 }
 
 export function getResultResource(resultName) {
+	// the results are stored in a file, and are fetched separately from the document
 	return createDocumentResource({
 		doctype: 'Insights Query Result',
 		name: resultName,
 		auto: false,
-		transform: (doc) => {
-			doc.results = safeJSONParse(doc.results, [])
-			return doc
+		whitelistedMethods: {
+			fetchResults: 'fetch_results',
 		},
 	})
 }
@@ -12,6 +12,7 @@ import useDocumentResource from '../helpers/resource'
 import { isFilterValid } from '../query/components/filter_utils'
 import { column, filter_group } from '../query/helpers'
 import session from '../session'
+import { getSocket } from '../socket'
 import { FilterArgs, FilterGroup, FilterOperator, FilterValue } from '../types/query.types'
 import {
 	InsightsDashboardv3,
@@ -159,13 +160,73 @@ function makeDashboard(name: string) {
 		})
 	}
 
+	// charts are executed together with `execute_charts`, a chart refreshed in the meantime
+	// waits for it, so that it isn't executed again while its results are on the way
+	let executingCharts: Promise<string[]> | undefined
+
 	function refresh(force = false) {
-		dashboard.doc.items
-			.filter((item) => item.type === 'chart')
-			.forEach((item) => refreshChart(item.chart, force))
+		return refreshCharts(undefined, force)
+	}
+
+	function refreshCharts(chartNames?: string[], force = false) {
+		const execution = executeCharts(chartNames, force)
+		executingCharts = execution
+		return execution.then((executedCharts) => {
+			if (executingCharts === execution) executingCharts = undefined
+			// charts that weren't executed, or whose query changed since it was saved, are executed on their own
+			executedCharts.forEach((chart_name) => refreshChart(chart_name))
+		})
 	}
 
-	function refreshChart(chart_name: string, force = false) {
+	async function executeCharts(chartNames?: string[], force = false) {
+		await waitUntil(() => dashboard.isloaded)
+		chartNames =
+			chartNames ||
+			dashboard.doc.items.filter((item) => item.type === 'chart').map((item) => item.chart)
+		if (!chartNames.length) return chartNames
+
+		const adhocFilters = {} as Record<string, ReturnType<typeof getAdhocFilters>>
+		chartNames.forEach((chart_name) => (adhocFilters[chart_name] = getAdhocFilters(chart_name)))
+
+		const settingResults: Promise<void>[] = []
+		function setResult(chart_name: string, response: any) {
+			if (!chartNames!.includes(chart_name) || !response || response.error) return
+			const chart = useChart(chart_name)
+			settingResults.push(
+				waitUntil(() => chart.isloaded && chart.dataQuery.isloaded).then(() => {
+					chart.dataQuery.adhocFilters = adhocFilters[chart_name]
+					chart.dataQuery.setExecutedResult(response)
+				})
+			)
+		}
+
+		// results are published as soon as each chart is executed
+		const socket = getSocket()
+		const onResult = (data: any) => {
+			if (data.dashboard === dashboard.doc.name) setResult(data.chart, data)
+		}
+		socket.on('insights_dashboard_chart_result', onResult)
+
+		await dashboard
+			.call('execute_charts', { charts: chartNames, adhoc_filters: adhocFilters, force })
+			.then((results: Record<string, any>) => {
+				Object.entries(results || {}).forEach(([chart_name, response]) =>
+					setResult(chart_name, response)
+				)
+			})
+			.catch(() => {
+				// charts without results are executed on their own
+			})
+			.finally(() => socket.off('insights_dashboard_chart_result', onResult))
+
+		await Promise.all(settingResults)
+		return chartNames
+	}
+
+	async function refreshChart(chart_name: string, force = false) {
+		if (!force && executingCharts) {
+			await executingCharts
+		}
 		const chart = useChart(chart_name)
 		chart.dataQuery.adhocFilters = getAdhocFilters(chart_name)
 		chart.refresh(force)
@@ -238,7 +299,7 @@ function makeDashboard(name: string) {
 		const filteredCharts = Object.keys(filterItem.links).filter(
 			(chart_name) => filterItem.links[chart_name]
 		)
-		filteredCharts.forEach((chart_name) => refreshChart(chart_name))
+		refreshCharts(filteredCharts)
 	}
 
 	function getColumnFromFilterLink(linkedColumn: string) {
@@ -333,6 +394,7 @@ function makeDashboard(name: string) {
 		normalizeLayout,
 
 		refresh,
+		refreshCharts,
 		refreshChart,
 
 		getAdhocFilters,
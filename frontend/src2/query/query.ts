@@ -1,7 +1,6 @@
 import { useDebouncedRefHistory } from '@vueuse/core'
 import { isEqual } from 'es-toolkit'
 import { dayjs, call } from 'frappe-ui'
-import { Buffer } from 'buffer'
 import { computed, reactive, ref, toRefs, unref } from 'vue'
 import {
 	copy,
@@ -17,6 +16,7 @@ import { FIELDTYPES } from '../helpers/constants'
 import useDocumentResource from '../helpers/resource'
 import { createToast } from '../helpers/toasts'
 import session from '../session'
+import { getSocket } from '../socket'
 import {
 	AdhocFilters,
 	CodeArgs,
@@ -159,21 +159,7 @@ export function makeQuery(name: string) {
 			})
 			.then((response: any) => {
 				if (!response) return
-
-				result.value.executedSQL = response.sql
-				result.value.columns = response.columns
-				result.value.rows = response.rows
-				result.value.totalRowCount = 0
-				result.value.formattedRows = getFormattedRows(result.value, query.doc.operations)
-				result.value.columnOptions = result.value.columns.map((column) => ({
-					label: column.name,
-					value: column.name,
-					description: column.type,
-					query: query.doc.name,
-					data_type: column.type,
-				}))
-				result.value.timeTaken = response.time_taken
-				result.value.lastExecutedAt = new Date()
+				setResult(response)
 			})
 			.catch(() => {
 				// Keep the last successful result visible; error details
@@ -188,6 +174,34 @@ export function makeQuery(name: string) {
 			})
 	}
 
+	function setResult(response: any) {
+		pagedRows = false
+		lastPageFetched.value = false
+		result.value.executedSQL = response.sql
+		result.value.columns = response.columns
+		result.value.rows = response.rows
+		result.value.totalRowCount = 0
+		result.value.formattedRows = getFormattedRows(result.value, query.doc.operations)
+		result.value.columnOptions = result.value.columns.map((column) => ({
+			label: column.name,
+			value: column.name,
+			description: column.type,
+			query: query.doc.name,
+			data_type: column.type,
+		}))
+		result.value.timeTaken = response.time_taken
+		result.value.lastExecutedAt = new Date()
+	}
+
+	function setExecutedResult(response: any) {
+		// results of the saved operations executed elsewhere, e.g. with the other charts of a dashboard
+		setResult(response)
+		lastExecutionArgs = {
+			operations: currentOperations.value,
+			adhoc_filters: adhocFilters.value,
+		}
+	}
+
 	const fetchingCount = ref(false)
 	async function fetchResultCount() {
 		if (!query.islocal) {
@@ -213,6 +227,49 @@ export function makeQuery(name: string) {
 			})
 	}
 
+	// whether the rows of the result were fetched with execute_page, instead of only the preview of execute
+	let pagedRows = false
+	const lastPageFetched = ref(false)
+	const fetchingPage = ref(false)
+	const canFetchNextPage = computed(() => {
+		// queries with a limit already have all of their rows in the preview
+		if (lastPageFetched.value || query.doc.operations.some((op) => op.type === 'limit')) {
+			return false
+		}
+		const { rows, totalRowCount } = result.value
+		return totalRowCount ? rows.length < totalRowCount : rows.length >= PREVIEW_ROW_COUNT
+	})
+	async function fetchNextPage() {
+		if (!query.doc.operations.length) return
+
+		// the preview of execute & the pages of execute_page are not fetched with the same query,
+		// so the preview is replaced by the first page to keep the order of the rows
+		const rows = pagedRows ? result.value.rows : []
+		const pageSize = pagedRows ? RESULT_PAGE_SIZE : result.value.rows.length + RESULT_PAGE_SIZE
+
+		fetchingPage.value = true
+		return query
+			.call('execute_page', {
+				offset: rows.length,
+				page_size: pageSize,
+				active_operation_idx: activeOperationIdx.value,
+				adhoc_filters: adhocFilters.value,
+			})
+			.then((response: any) => {
+				if (!response) return
+				pagedRows = true
+				lastPageFetched.value = response.rows.length < pageSize
+				result.value.rows = [...rows, ...response.rows]
+				result.value.formattedRows = getFormattedRows(result.value, query.doc.operations)
+				if (response.total_count !== null && response.total_count !== undefined) {
+					result.value.totalRowCount = response.total_count
+				}
+			})
+			.finally(() => {
+				fetchingPage.value = false
+			})
+	}
+
     async function formatSQL(args: SQLArgs): Promise<string> {
         if (!args.raw_sql.trim()) return args.raw_sql || ''
 
@@ -494,86 +551,133 @@ export function makeQuery(name: string) {
 		activeOperationIdx.value = newOperations.length - 1
 	}
 
+    // the listener of the progress events of the running export
+    let exportListener: ((data: any) => void) | null = null
+
+    function stopListeningToExport(listener: ((data: any) => void) | null = exportListener) {
+        if (!listener) return
+        getSocket().off('insights_export_progress', listener)
+        if (exportListener === listener) {
+            exportListener = null
+        }
+    }
+
     function downloadResults(format: string = 'csv', filename?: string) {
-        const _downloadResults =  () => {
-            downloading.value = true
-            const token = Date.now() + Math.random()
-            currentDownloadToken.value = token
-            return call('insights.api.run_doc_method', {
-                method: 'download_results',
-                docs: {
-                    ...(query.doc || {}),
-                    __islocal: query.islocal,
-                },
-                args: {
-                    format,
-                    active_operation_idx: activeOperationIdx.value,
-                    adhoc_filters: adhocFilters.value,
-                },
-            })
-                .then((payload: any) => {
-                    if (currentDownloadToken.value !== token) return
-                    const data: string = payload?.message
-                    if (!data) {
-                        createToast({
-                            title: __('Download Failed'),
-                            message: 'No data found to download.',
-                            variant: 'warning',
-                        })
-                        return
-                    }
-
-					let blob: Blob
-					let extension: string
-					let mimeType: string
-
-                    if (format === 'excel') {
-                        const bytes = Buffer.from(data, 'base64')
-                        blob = new Blob([bytes], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' })
-						extension = 'xlsx'
-						mimeType = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-					} else {
-						blob = new Blob([data], { type: 'text/csv' })
-						extension = 'csv'
-						mimeType = 'text/csv'
-					}
+        stopListeningToExport()
+        downloading.value = true
+        const token = Date.now() + Math.random()
+        currentDownloadToken.value = token
+        const extension = EXPORT_FILE_EXTENSIONS[format] || format
+        const finalFileName = `${filename || query.doc.title || 'data'}.${extension}`
+
+        const finishDownload = () => {
+            if (currentDownloadToken.value === token) {
+                downloading.value = false
+                currentDownloadToken.value = null
+            }
+        }
 
-					const url = window.URL.createObjectURL(blob)
-					const a = document.createElement('a')
-					a.setAttribute('hidden', '')
-					a.setAttribute('href', url)
-                    const finalFileName = `${filename || query.doc.title || 'data'}.${extension}`
-                    a.setAttribute('download', finalFileName)
-					document.body.appendChild(a)
-					a.click()
-					document.body.removeChild(a)
-					window.URL.revokeObjectURL(url)
-                    createToast({
-                        title: __('Export Successful'),
-                        message: `File "${finalFileName}" exported successfully`,
-                        variant: 'success',
-                    })
-				})
-                .catch((error: any) => {
-                    if (currentDownloadToken.value !== token) return
-                    createToast({
-                        title: __('Download Failed'),
-                        message: error?.message || 'Failed to download file',
-                        variant: 'error',
-                    })
-                })
-                .finally(() => {
-                    if (currentDownloadToken.value === token) {
-                        downloading.value = false
-                        currentDownloadToken.value = null
-                    }
+        let exportId: string | null = null
+        // events of exports that finished before enqueue_export returned their id
+        const finishedExports: Record<string, any> = {}
+
+        const onExportFinished = (data: any) => {
+            stopListeningToExport(onProgress)
+            if (currentDownloadToken.value !== token) return
+            finishDownload()
+
+            if (data.status === 'Failed' || !data.file_url) {
+                createToast({
+                    title: __('Download Failed'),
+                    message: data.error || 'Failed to download file',
+                    variant: 'error',
                 })
-		}	
+                return
+            }
 
-		_downloadResults()
-	}
+            const a = document.createElement('a')
+            a.setAttribute('hidden', '')
+            a.setAttribute('href', data.file_url)
+            a.setAttribute('download', finalFileName)
+            document.body.appendChild(a)
+            a.click()
+            document.body.removeChild(a)
+            createToast({
+                title: __('Export Successful'),
+                message: data.truncated
+                    ? `File "${finalFileName}" exported with the first ${data.rows} rows`
+                    : `File "${finalFileName}" exported successfully`,
+                variant: data.truncated ? 'warning' : 'success',
+            })
+        }
+
+        const onProgress = (data: any) => {
+            if (!data?.export_id || data.status === 'Running') return
+            if (!exportId) {
+                finishedExports[data.export_id] = data
+            } else if (data.export_id === exportId) {
+                onExportFinished(data)
+            }
+        }
+
+        // the export runs in the background, and publishes its progress until the file is ready.
+        // the listener is added before the export is queued, so that a quick export isn't missed
+        exportListener = onProgress
+        getSocket().on('insights_export_progress', onProgress)
+
+        return call('insights.api.run_doc_method', {
+            method: 'enqueue_export',
+            docs: {
+                ...(query.doc || {}),
+                __islocal: query.islocal,
+            },
+            args: {
+                format,
+                active_operation_idx: activeOperationIdx.value,
+                adhoc_filters: adhocFilters.value,
+            },
+        })
+            .then((payload: any) => {
+                exportId = payload?.message
+                if (!exportId) {
+                    throw new Error('Failed to start the export')
+                }
+                if (finishedExports[exportId]) {
+                    return onExportFinished(finishedExports[exportId])
+                }
+
+                // the status is also polled, since guests don't receive the events
+                // and the event may be missed while the socket is disconnected
+                return pollExportStatus(exportId)
+            })
+            .catch(onExportError)
+
+        function pollExportStatus(exportId: string): Promise<void> {
+            return query.call('get_export_status', { export_id: exportId }).then((status: any) => {
+                if (exportListener !== onProgress) return
+                if (status && status.status !== 'Running') {
+                    return onExportFinished(status)
+                }
+                setTimeout(() => {
+                    pollExportStatus(exportId).catch(onExportError)
+                }, EXPORT_STATUS_POLL_INTERVAL)
+            })
+        }
+
+        function onExportError(error: any) {
+            stopListeningToExport(onProgress)
+            if (currentDownloadToken.value !== token) return
+            finishDownload()
+            createToast({
+                title: __('Download Failed'),
+                message: error?.message || 'Failed to download file',
+                variant: 'error',
+            })
+        }
+    }
 
     function cancelDownload() {
+        stopListeningToExport()
         currentDownloadToken.value = null
         downloading.value = false
     }
@@ -942,10 +1046,14 @@ export function makeQuery(name: string) {
 		autoExecute,
 		executing,
 		fetchingCount,
+		fetchingPage,
+		canFetchNextPage,
 		result,
 
 		execute,
+		setExecutedResult,
 		fetchResultCount,
+		fetchNextPage,
 
 		setOperations,
 		setActiveOperation,
@@ -999,6 +1107,21 @@ export function makeQuery(name: string) {
 	})
 }
 
+// rows returned by execute for queries without a limit
+const PREVIEW_ROW_COUNT = 100
+// rows fetched by every page after the preview of the results
+const RESULT_PAGE_SIZE = 500
+
+// milliseconds between the status checks of a running export
+const EXPORT_STATUS_POLL_INTERVAL = 3000
+
+const EXPORT_FILE_EXTENSIONS: Record<string, string> = {
+	csv: 'csv',
+	excel: 'xlsx',
+	parquet: 'parquet',
+	arrow: 'arrow',
+}
+
 export const EMPTY_RESULT: QueryResult = {
 	executedSQL: '',
 	totalRowCount: 0,
@@ -16,6 +16,7 @@ function makeSettings() {
 			allowed_origins: '',
 			max_records_to_sync: 10_00_000,
 			max_memory_usage: 512,
+			import_workers: 1,
 			fiscal_year_start: '2024-04-01',
 			week_starts_on: 'Monday',
 			enable_data_store: false,
@@ -42,6 +43,7 @@ type InsightsSettings = {
 	allowed_origins: string
 	max_records_to_sync: number
 	max_memory_usage: number
+	import_workers: number
 	fiscal_year_start: string
 	week_starts_on: string
 	enable_data_store: boolean
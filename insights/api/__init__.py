@@ -5,7 +5,6 @@ import frappe
 import ibis
 from frappe.defaults import get_user_default, set_user_default
 from frappe.handler import is_valid_http_method, is_whitelisted
-from frappe.integrations.utils import make_post_request
 from frappe.monitor import add_data_to_monitor
 from frappe.rate_limiter import rate_limit
 
@@ -91,6 +90,9 @@ def contact_team(message_type, message_content, is_critical=False):
     if not message_title:
         frappe.throw("Invalid Message Type")
 
+    # imports requests, which is only needed here
+    from frappe.integrations.utils import make_post_request
+
     try:
         make_post_request(
             "https://frappeinsights.com/api/method/contact-team",
@@ -247,8 +249,8 @@ def run_doc_method(method: str, docs: dict | str, args: dict | None = None):
 
 def is_public_method(doctype: str, method: str):
     public_methods = {
-        "Insights Query v3": ["execute", "download_results"],
-        "Insights Dashboard v3": ["get_distinct_column_values"],
+        "Insights Query v3": ["execute", "download_results", "enqueue_export", "get_export_status"],
+        "Insights Dashboard v3": ["get_distinct_column_values", "execute_charts"],
     }
 
     if doctype in public_methods and method in public_methods[doctype]:
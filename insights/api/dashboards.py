@@ -1,7 +1,9 @@
 import frappe
+from frappe.query_builder.functions import Count
 
 from insights.api.permissions import is_private
 from insights.decorators import insights_whitelist, validate_type
+from insights.utils import get_view_counts
 
 
 @insights_whitelist()
@@ -89,28 +91,41 @@ def get_dashboards(search_term=None, limit=50):
             "creation",
             "modified",
             "preview_image",
-            "items",
         ],
         order_by="creation desc",
         limit=limit,
     )
 
+    dashboard_names = [dashboard.name for dashboard in dashboards]
+    chart_counts = get_chart_counts(dashboard_names)
+    view_counts = get_view_counts("Insights Dashboard v3", dashboard_names)
     for dashboard in dashboards:
-        items = frappe.parse_json(dashboard["items"])
-        charts = [item for item in items if item["type"] == "chart"]
-        dashboard["charts"] = len(charts)
-        dashboard["views"] = frappe.db.count(
-            "View Log",
-            filters={
-                "reference_doctype": "Insights Dashboard v3",
-                "reference_name": dashboard.name,
-            },
-        )
-        del dashboard["items"]
+        dashboard["charts"] = chart_counts.get(dashboard.name, 0)
+        dashboard["views"] = view_counts.get(dashboard.name, 0)
 
     return dashboards
 
 
+def get_chart_counts(dashboards: list) -> dict:
+    # `linked_charts` has a row for each chart in the dashboard's items
+    if not dashboards:
+        return {}
+
+    DashboardChart = frappe.qb.DocType("Insights Dashboard Chart v3")
+    chart_counts = (
+        frappe.qb.from_(DashboardChart)
+        .select(DashboardChart.parent, Count("*").as_("charts"))
+        .where(
+            (DashboardChart.parenttype == "Insights Dashboard v3")
+            & (DashboardChart.parentfield == "linked_charts")
+            & DashboardChart.parent.isin(dashboards)
+        )
+        .groupby(DashboardChart.parent)
+        .run()
+    )
+    return dict(chart_counts)
+
+
 @insights_whitelist()
 @validate_type
 def update_dashboard_preview(dashboard_name: str):
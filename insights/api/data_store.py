@@ -57,11 +57,11 @@ def get_data_store_tables(data_source=None, search_term=None, limit=100):
 
 @insights_whitelist()
 @validate_type
-def import_table(data_source: str, table_name: str):
+def import_table(data_source: str, table_name: str, incremental: bool = False):
     frappe.only_for("Insights Admin")
     name = get_table_name(data_source, table_name)
     table_doc = frappe.get_doc("Insights Table v3", name)
-    table_doc.import_to_warehouse()
+    table_doc.import_to_warehouse(incremental=incremental)
 
 
 def sync_tables():
@@ -73,7 +73,8 @@ def sync_tables():
     )
 
     for table in tables:
-        import_table(table.data_source, table.table)
+        # tables with an incremental sync mode only fetch the rows changed since the last sync
+        import_table(table.data_source, table.table, incremental=True)
 
 
 def update_failed_sync_status():
@@ -2,7 +2,7 @@ import frappe
 from ibis import _
 
 from insights.decorators import insights_whitelist
-from insights.utils import DocShare
+from insights.utils import DocShare, get_view_counts
 
 
 @insights_whitelist()
@@ -22,50 +22,42 @@ def get_workbooks(search_term=None, limit=100):
         ],
         limit=limit,
     )
-    # FIX: figure out how to use frappe.qb while respecting permissions
-    # TODO: use frappe.qb to get the view count
     workbook_names = [workbook["name"] for workbook in workbooks]
-    workbook_views = frappe.get_all(
-        "View Log",
-        filters={
-            "reference_doctype": "Insights Workbook",
-            "reference_name": ["in", workbook_names],
-        },
-        fields=["reference_name", "name"],
-    )
+    view_counts = get_view_counts("Insights Workbook", workbook_names)
+    shares = get_workbook_shares(workbook_names)
     for workbook in workbooks:
-        views = [view for view in workbook_views if str(view["reference_name"]) == str(workbook["name"])]
-        workbook["views"] = len(views)
+        workbook["views"] = view_counts.get(str(workbook["name"]), 0)
 
-    for workbook in workbooks:
-        organization_has_access = frappe.db.exists(
-            "DocShare",
-            {
-                "share_doctype": "Insights Workbook",
-                "share_name": workbook["name"],
-                "everyone": 1,
-                "read": 1,
-            },
-        )
-        if organization_has_access:
+        workbook_shares = shares.get(str(workbook["name"]), [])
+        if any(share.everyone for share in workbook_shares):
             workbook["shared_with_organization"] = True
             continue
 
-        shared_with = frappe.get_all(
-            "DocShare",
-            filters={
-                "share_doctype": "Insights Workbook",
-                "share_name": workbook["name"],
-                "user": ["!=", workbook["owner"]],
-                "read": 1,
-            },
-            pluck="user",
-        )
-        workbook["shared_with"] = shared_with
+        workbook["shared_with"] = [
+            share.user for share in workbook_shares if share.user and share.user != workbook["owner"]
+        ]
 
     return workbooks
 
 
+def get_workbook_shares(workbooks: list) -> dict:
+    if not workbooks:
+        return {}
+
+    shares = {}
+    for share in frappe.get_all(
+        "DocShare",
+        filters={
+            "share_doctype": "Insights Workbook",
+            "share_name": ["in", workbooks],
+            "read": 1,
+        },
+        fields=["share_name", "user", "everyone"],
+    ):
+        shares.setdefault(str(share.share_name), []).append(share)
+    return shares
+
+
 @insights_whitelist()
 def import_workbook(workbook):
     from insights.insights.doctype.insights_workbook.insights_workbook import import_workbook
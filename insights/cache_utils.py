@@ -29,6 +29,29 @@ def get_or_set_cache(key, func, force=False, expiry=EXPIRY):
 
 
 @frappe.whitelist()
-def reset_insights_cache():
+def reset_insights_cache(data_source=None, table_name=None):
+    """
+    Clears all the cached values of insights, or only the cached results of the queries
+    that read from the warehouse tables of a data source or a single table
+    """
     frappe.only_for("System Manager")
-    frappe.cache().delete_keys("insights*")
+    if not data_source:
+        frappe.cache().delete_keys("insights*")
+        return
+
+    from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+        get_warehouse_table_name,
+    )
+    from insights.insights.doctype.insights_data_source_v3.result_cache import (
+        bump_table_version,
+    )
+
+    tables = [table_name]
+    if not table_name:
+        tables = frappe.get_all(
+            "Insights Table v3",
+            filters={"data_source": data_source, "stored": 1},
+            pluck="table",
+        )
+    for table in tables:
+        bump_table_version(get_warehouse_table_name(data_source, table))
@@ -152,8 +152,32 @@ has_permission = {
 
 doc_events = {
     "User": {
-        "on_change": "insights.insights.doctype.insights_team.insights_team.update_admin_team",
-    }
+        "on_change": [
+            "insights.insights.doctype.insights_team.insights_team.update_admin_team",
+            "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+        ],
+    },
+    "User Permission": {
+        "on_change": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+        "on_trash": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+    },
+    "DocShare": {
+        "on_change": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+        "on_trash": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+    },
+    # team permissions decide the tables & table restrictions that builds are cached with
+    "Insights Team": {
+        "on_change": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+        "on_trash": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+    },
+    "Insights Team Member": {
+        "on_change": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+        "on_trash": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+    },
+    "Insights Resource Permission": {
+        "on_change": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+        "on_trash": "insights.insights.doctype.insights_table_v3.insights_table_v3.bump_permission_version",
+    },
 }
 
 # Scheduled Tasks
@@ -162,9 +186,14 @@ doc_events = {
 scheduler_events = {
     "all": [
         "insights.insights.doctype.insights_alert.insights_alert.send_alerts",
+        "insights.insights.doctype.insights_dashboard_v3.cache_warmup.warm_up_scheduled_dashboards",
+        "insights.insights.doctype.insights_dashboard_v3.cache_warmup.enqueue_pending_warmup",
+        "insights.insights.doctype.insights_query_v3.insights_query_v3.materialize_queries",
     ],
     "daily": [
         "insights.api.data_store.sync_tables",
+        "insights.insights.doctype.insights_query_v3.export.delete_old_exports",
+        "insights.insights.doctype.insights_table_v3.insights_table_v3.delete_unused_allowed_documents",
     ],
     "hourly": [
         "insights.api.data_store.update_failed_sync_status",
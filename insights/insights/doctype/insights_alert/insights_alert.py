@@ -5,8 +5,6 @@ from datetime import datetime
 
 import frappe
 import pandas as pd
-import telegram
-from croniter import croniter
 from frappe.model.document import Document
 from frappe.utils import validate_email_address
 from frappe.utils.data import get_datetime, get_datetime_str, now_datetime
@@ -142,6 +140,8 @@ class InsightsAlert(Document):
             self.cron_format = CRON_MAP[self.frequency]
 
         start_time = get_datetime(self.last_execution or datetime(2000, 1, 1))
+        from croniter import croniter
+
         return croniter(self.cron_format, start_time).get_next(datetime)
 
     def is_event_due(self):
@@ -184,4 +184,6 @@ class TelegramAlert:
 
     @property
     def bot(self):
+        import telegram
+
         return telegram.Bot(token=self.token)
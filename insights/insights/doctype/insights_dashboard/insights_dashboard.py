@@ -11,6 +11,9 @@ from frappe.model.document import Document
 from insights import notify
 from insights.api.permissions import is_private
 from insights.cache_utils import make_digest
+from insights.insights.doctype.insights_data_source_v3.result_cache import (
+    coalesce_execution,
+)
 
 from .utils import guess_layout_for_chart
 
@@ -43,13 +46,8 @@ class InsightsDashboard(Document):
     @frappe.whitelist()
     def clear_charts_cache(self):
         frappe.cache().delete_keys(f"*{self.cache_namespace}:*")
-        for row in self.items:
-            if '"query"' not in row.options:
-                continue
-            options = frappe.parse_json(row.options)
-            if not options.query:
-                continue
-            frappe.cache().delete_keys(f"*insights_query_results:{options.query}*")
+        for query_name in self.get_query_names():
+            frappe.cache().delete_keys(f"*insights_query_results:{query_name}*")
         notify(**{"type": "success", "title": _("Cache Cleared")})
 
     @frappe.whitelist()
@@ -64,15 +62,56 @@ class InsightsDashboard(Document):
 
         return self.run_query(query_name, additional_filters=filters)
 
+    def get_query_names(self):
+        query_names = set()
+        for row in self.items:
+            if not row.options or '"query"' not in row.options:
+                continue
+            options = frappe.parse_json(row.options)
+            if options.query:
+                query_names.add(options.query)
+        return query_names
+
+    def get_query_modified(self, query_name):
+        # modified of all the queries of the dashboard are fetched at once, and kept for the request
+        query_modified = get_request_cache("insights_query_modified")
+        if query_name not in query_modified:
+            query_names = {query_name, *self.get_query_names()} - query_modified.keys()
+            query_modified.update(
+                frappe.get_all(
+                    "Insights Query",
+                    filters={"name": ["in", list(query_names)]},
+                    fields=["name", "modified"],
+                    as_list=True,
+                )
+            )
+        return query_modified.get(query_name)
+
     def run_query(self, query_name, additional_filters=None):
-        last_modified = frappe.db.get_value("Insights Query", query_name, "modified")
+        last_modified = self.get_query_modified(query_name)
         key = make_digest(query_name, last_modified, additional_filters)
         key = f"{self.cache_namespace}:{key}"
-        if frappe.cache().exists(key):
-            return frappe.cache().get_value(key)
 
+        # charts with the same query and filters are fetched once per request
+        request_results = get_request_cache("insights_dashboard_results")
+        if key in request_results:
+            return request_results[key]
+
+        if frappe.cache().exists(key):
+            results = frappe.cache().get_value(key)
+        else:
+            # and once across requests, other requests wait for the results of the first one
+            with coalesce_execution(key) as waited:
+                if waited and frappe.cache().exists(key):
+                    results = frappe.cache().get_value(key)
+                else:
+                    results = self.fetch_query_results(key, query_name, additional_filters)
+
+        request_results[key] = results
+        return results
+
+    def fetch_query_results(self, key, query_name, additional_filters=None):
         query = frappe.get_cached_doc("Insights Query", query_name)
-        # TODO: if 3 charts with same query results is fetched, it will be fetched 3 times
         new_results = query.fetch_results(additional_filters=additional_filters)
 
         query_result_expiry = frappe.db.get_single_value(
@@ -85,6 +124,12 @@ class InsightsDashboard(Document):
         return new_results
 
 
+def get_request_cache(name) -> dict:
+    if not hasattr(frappe.local, name):
+        setattr(frappe.local, name, {})
+    return getattr(frappe.local, name)
+
+
 @frappe.whitelist()
 def get_queries_column(query_names):
     # TODO: handle permissions
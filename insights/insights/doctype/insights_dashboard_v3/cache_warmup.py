@@ -0,0 +1,182 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from datetime import datetime
+
+import frappe
+from croniter import croniter
+from frappe.query_builder.functions import Count
+from frappe.utils.background_jobs import is_job_enqueued
+from frappe.utils.data import add_days, get_datetime, now_datetime
+
+from insights.insights.doctype.insights_data_source_v3.insights_data_source_v3 import (
+    db_connections,
+)
+
+WARMUP_JOB_ID = "insights_dashboard_cache_warmup"
+PENDING_TABLES_KEY = "insights:cache_warmup_tables"
+# set when tables are added, so that a warmup that is running goes through the pending tables again
+RERUN_REQUESTED_KEY = "insights:cache_warmup_rerun"
+# only dashboards viewed recently are warmed up after an import
+VIEW_LOG_DAYS = 30
+MAX_DASHBOARDS = 50
+
+
+def enqueue_cache_warmup(data_source: str, table_name: str):
+    """
+    Queues a warmup of the dashboards that read from an imported table.
+
+    Tables imported while a warmup is queued or running are added to the same warmup,
+    so that a sync of many tables doesn't execute the same dashboards again and again.
+    """
+    frappe.cache().sadd(PENDING_TABLES_KEY, frappe.as_json([data_source, table_name]))
+    frappe.cache().set_value(RERUN_REQUESTED_KEY, 1)
+    enqueue_warmup_job()
+
+
+def enqueue_warmup_job():
+    # not queued again while a warmup is queued or running, the rerun flag hands the tables over to it
+    frappe.enqueue(
+        method="insights.insights.doctype.insights_dashboard_v3.cache_warmup.warm_up_imported_tables",
+        queue="long",
+        job_id=WARMUP_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=True,
+    )
+
+
+def enqueue_pending_warmup():
+    # called by the scheduler, for tables that were added just as a warmup was finishing
+    if frappe.cache().get_value(RERUN_REQUESTED_KEY):
+        enqueue_warmup_job()
+
+
+def warm_up_imported_tables():
+    while frappe.cache().get_value(RERUN_REQUESTED_KEY):
+        frappe.cache().delete_value(RERUN_REQUESTED_KEY)
+        while tables := pop_pending_tables():
+            dashboards = get_dependent_dashboards(tables)
+            dashboards = get_popular_dashboards(dashboards)[:MAX_DASHBOARDS]
+            for dashboard in dashboards:
+                warm_up_dashboard(dashboard)
+
+
+def pop_pending_tables() -> list[tuple[str, str]]:
+    tables = []
+    while table := frappe.cache().spop(PENDING_TABLES_KEY):
+        if isinstance(table, bytes):
+            table = table.decode()
+        tables.append(tuple(frappe.parse_json(table)))
+    return tables
+
+
+def warm_up_scheduled_dashboards():
+    # called by the scheduler, warms up the dashboards with a cache warmup schedule that are due
+    dashboards = frappe.get_all(
+        "Insights Dashboard v3",
+        filters={"cache_warmup_cron": ["is", "set"]},
+        fields=["name", "cache_warmup_cron", "last_cache_warmup"],
+    )
+    for dashboard in dashboards:
+        start_time = get_datetime(dashboard.last_cache_warmup or datetime(2000, 1, 1))
+        try:
+            next_warmup = croniter(dashboard.cache_warmup_cron, start_time).get_next(datetime)
+        except Exception:
+            continue
+        if next_warmup > now_datetime():
+            continue
+
+        job_id = f"insights_dashboard_cache_warmup_{dashboard.name}"
+        if is_job_enqueued(job_id):
+            continue
+
+        frappe.enqueue(
+            method="insights.insights.doctype.insights_dashboard_v3.cache_warmup.warm_up_dashboard",
+            dashboard=dashboard.name,
+            queue="long",
+            job_id=job_id,
+        )
+
+
+def warm_up_dashboard(dashboard: str):
+    try:
+        doc = frappe.get_doc("Insights Dashboard v3", dashboard)
+        with db_connections():
+            doc.warm_up_cache()
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title=f"Failed to warm up cache of dashboard {dashboard}")
+
+
+def get_dependent_dashboards(tables: list[tuple[str, str]]) -> list[str]:
+    queries = get_dependent_queries(tables)
+    if not queries:
+        return []
+
+    charts = frappe.get_all(
+        "Insights Chart v3",
+        or_filters={"query": ["in", queries], "data_query": ["in", queries]},
+        pluck="name",
+    )
+    if not charts:
+        return []
+
+    return frappe.get_all(
+        "Insights Dashboard Chart v3",
+        filters={"parenttype": "Insights Dashboard v3", "chart": ["in", charts]},
+        pluck="parent",
+        distinct=True,
+    )
+
+
+def get_dependent_queries(tables: list[tuple[str, str]]) -> list[str]:
+    # queries that read from the tables directly, and the queries that read from them
+    tables = set(tables)
+    queries = frappe.get_all(
+        "Insights Query v3",
+        or_filters=[["operations", "like", f"%{table_name}%"] for _, table_name in tables],
+        fields=["name", "operations"],
+    )
+
+    dependents = set()
+    for query in queries:
+        for op in frappe.parse_json(query.operations) or []:
+            table = op.get("table") or {}
+            if table.get("type") == "table" and (table.get("data_source"), table.get("table_name")) in tables:
+                dependents.add(query.name)
+                break
+
+    linked_by = {}
+    for query in frappe.get_all("Insights Query v3", fields=["name", "linked_queries"]):
+        for linked_query in frappe.parse_json(query.linked_queries) or []:
+            linked_by.setdefault(linked_query, set()).add(query.name)
+
+    to_visit = set(dependents)
+    while to_visit:
+        query = to_visit.pop()
+        for dependent in linked_by.get(query, set()) - dependents:
+            dependents.add(dependent)
+            to_visit.add(dependent)
+
+    return list(dependents)
+
+
+def get_popular_dashboards(dashboards: list[str]) -> list[str]:
+    # most viewed first, dashboards that were not viewed recently are skipped
+    if not dashboards:
+        return []
+
+    ViewLog = frappe.qb.DocType("View Log")
+    return (
+        frappe.qb.from_(ViewLog)
+        .select(ViewLog.reference_name)
+        .where(
+            (ViewLog.reference_doctype == "Insights Dashboard v3")
+            & ViewLog.reference_name.isin(dashboards)
+            & (ViewLog.creation > add_days(now_datetime(), -VIEW_LOG_DAYS))
+        )
+        .groupby(ViewLog.reference_name)
+        .orderby(Count(ViewLog.name), order=frappe.qb.desc)
+        .run(pluck=True)
+    )
@@ -6,12 +6,30 @@ import re
 from contextlib import contextmanager
 
 import frappe
-import requests
+import ibis
 from frappe.model.document import Document
 from frappe.query_builder import Interval
 from frappe.query_builder.functions import Now
 
-from insights.utils import DocShare, File
+from insights.insights.doctype.insights_dashboard_v3.query_planner import (
+    share_common_prefixes,
+)
+from insights.insights.doctype.insights_data_source_v3.batch_execution import (
+    execute_ibis_queries,
+)
+from insights.insights.doctype.insights_data_source_v3.ibis_utils import get_cache_expiry
+from insights.insights.doctype.insights_data_source_v3.result_cache import (
+    cache_response,
+    get_cached_response,
+)
+from insights.insights.doctype.insights_query_v3.insights_query_v3 import (
+    RESPONSE_CACHE_EXPIRY,
+    set_adhoc_filters,
+)
+from insights.utils import DocShare, File, create_execution_log
+
+# "`<query>`.`<column>`"
+LINKED_COLUMN_PATTERN = "^`([^`]+)`\\.`([^`]+)`$"
 
 
 def _generate_local_preview_placeholder() -> bytes:
@@ -168,10 +186,15 @@ class InsightsDashboardv3(Document):
 
     if TYPE_CHECKING:
         from frappe.types import DF
-        from insights.insights.doctype.insights_dashboard_chart_v3.insights_dashboard_chart_v3 import InsightsDashboardChartv3
 
+        from insights.insights.doctype.insights_dashboard_chart_v3.insights_dashboard_chart_v3 import (
+            InsightsDashboardChartv3,
+        )
+
+        cache_warmup_cron: DF.Data | None
         is_public: DF.Check
         items: DF.JSON | None
+        last_cache_warmup: DF.Datetime | None
         linked_charts: DF.TableMultiSelect[InsightsDashboardChartv3]
         old_name: DF.Data | None
         preview_image: DF.Data | None
@@ -215,6 +238,15 @@ class InsightsDashboardv3(Document):
         )
         return d
 
+    def validate(self):
+        if not self.cache_warmup_cron:
+            return
+
+        from croniter import croniter
+
+        if not croniter.is_valid(self.cache_warmup_cron):
+            frappe.throw(f"{self.cache_warmup_cron} is not a valid cron expression")
+
     def before_save(self):
         self.set_linked_charts()
         self.enqueue_update_dashboard_preview()
@@ -229,6 +261,127 @@ class InsightsDashboardv3(Document):
             ],
         )
 
+    @frappe.whitelist()
+    def execute_charts(self, charts=None, adhoc_filters=None, force=False, publish=True):
+        """
+        Executes the data queries of the charts on this dashboard in a single request.
+
+        `adhoc_filters` maps a chart to the filters applied on it by the dashboard filters.
+        Queries are built one after the other, charts with the same query are executed once,
+        charts that aggregate the same source share a materialization of it
+        and the rest are executed concurrently. Each result is published to the user
+        as soon as it is ready, and all the results are returned at the end.
+        """
+        from insights.api.shared import is_public
+
+        force = frappe.utils.sbool(force)
+        adhoc_filters = frappe.parse_json(adhoc_filters) or {}
+        chart_names = [item["chart"] for item in frappe.parse_json(self.items) if item["type"] == "chart"]
+        if charts:
+            charts = frappe.parse_json(charts)
+            chart_names = [chart for chart in chart_names if chart in charts]
+
+        data_queries = dict(
+            frappe.get_all(
+                "Insights Chart v3",
+                filters={"name": ["in", chart_names]},
+                fields=["name", "data_query"],
+                as_list=True,
+            )
+        )
+
+        results = {}
+
+        def set_result(chart, response):
+            results[chart] = response
+            if publish and frappe.session.user != "Guest":
+                frappe.publish_realtime(
+                    event="insights_dashboard_chart_result",
+                    user=frappe.session.user,
+                    message={"dashboard": self.name, "chart": chart, **response},
+                )
+
+        # cache key -> (query, ibis query, sql, limit, charts)
+        pending = {}
+        for chart in chart_names:
+            if not data_queries.get(chart):
+                continue
+            try:
+                query = frappe.get_cached_doc("Insights Query v3", data_queries[chart])
+                if not query.has_permission("read") and not is_public(self.doctype, self.name):
+                    raise frappe.PermissionError
+                if not frappe.parse_json(query.operations):
+                    continue
+                with set_adhoc_filters(adhoc_filters.get(chart)):
+                    ibis_query = query.build()
+                limit = query.get_limit()
+                sql = ibis.to_sql(ibis_query)
+                cache_key = query.get_response_cache_key(ibis_query, sql, limit)
+            except Exception as e:
+                set_result(chart, {"error": get_error_message(e)})
+                continue
+
+            if not force and (response := get_cached_response(cache_key)):
+                set_result(chart, {**response, "time_taken": -1})
+                continue
+
+            if cache_key not in pending:
+                pending[cache_key] = (query, ibis_query, sql, limit, [])
+            pending[cache_key][4].append(chart)
+
+        queries = {key: (ibis_query, limit) for key, (_, ibis_query, _, limit, _) in pending.items()}
+        # charts that aggregate the same source run over a single materialization of it
+        shared = share_common_prefixes(
+            {key: (query, adhoc_filters.get(charts[0])) for key, (query, _, _, _, charts) in pending.items()}
+        )
+        for key, shared_query in shared.items():
+            queries[key] = (shared_query, queries[key][1])
+
+        for key, result, time_taken, error in execute_ibis_queries(queries):
+            query, ibis_query, sql, _, charts = pending[key]
+            if error:
+                response = {"error": get_error_message(error)}
+            else:
+                create_execution_log(sql, time_taken, query.name)
+                response = query.get_response(ibis_query, sql, result, time_taken)
+                cache_response(key, response, cache_expiry=get_cache_expiry(ibis_query, RESPONSE_CACHE_EXPIRY))
+
+            for chart in charts:
+                set_result(chart, response)
+
+        return results
+
+    def warm_up_cache(self):
+        # executes the charts as they are shown when the dashboard is opened,
+        # so that the first viewer after a data refresh doesn't wait for the queries
+        self.execute_charts(adhoc_filters=self.get_default_adhoc_filters(), force=True, publish=False)
+        self.db_set("last_cache_warmup", frappe.utils.now(), update_modified=False)
+
+    def get_default_adhoc_filters(self):
+        adhoc_filters = {}
+        for item in frappe.parse_json(self.items):
+            if item["type"] != "filter" or not item.get("default_operator") or not item.get("default_value"):
+                continue
+
+            for chart, linked_column in (item.get("links") or {}).items():
+                match = re.match(LINKED_COLUMN_PATTERN, linked_column or "")
+                if not match:
+                    continue
+
+                query, column_name = match.groups()
+                filter_group = adhoc_filters.setdefault(chart, {}).setdefault(
+                    query,
+                    {"type": "filter_group", "logical_operator": "And", "filters": []},
+                )
+                filter_group["filters"].append(
+                    {
+                        "column": {"type": "column", "column_name": column_name},
+                        "operator": item["default_operator"],
+                        "value": item["default_value"],
+                    }
+                )
+        return adhoc_filters
+
     @frappe.whitelist()
     def get_distinct_column_values(self, query, column_name, search_term=None):
         is_guest = frappe.session.user == "Guest"
@@ -246,9 +399,8 @@ class InsightsDashboardv3(Document):
         for f in filters:
             # check if there is a filter which has "link": { 'chart': "`<query>`.`<column>`" }
             linked_columns = f.get("links", {}).values()
-            pattern = "^`([^`]+)`\\.`([^`]+)`$"
             for linked_column in linked_columns:
-                match = re.match(pattern, linked_column)
+                match = re.match(LINKED_COLUMN_PATTERN, linked_column)
                 if (
                     match
                     and match.groups()[0] == query
@@ -389,6 +541,14 @@ class InsightsDashboardv3(Document):
         self.db_set("is_public", is_public)
 
 
+def get_error_message(e: Exception) -> str:
+    if "max_statement_time" in str(e):
+        return "Query execution time exceeded the limit. Please try again with a smaller timespan or a more specific filter."
+    if isinstance(e, frappe.PermissionError):
+        return "You do not have permission to view this chart"
+    return str(e)
+
+
 def get_page_preview(url: str, headers: dict | None = None) -> bytes:
     """
     Return dashboard preview bytes.
@@ -401,6 +561,8 @@ def get_page_preview(url: str, headers: dict | None = None) -> bytes:
     service_url = getattr(frappe.conf, "preview_generator_url", None)
 
     if service_url:
+        import requests
+
         try:
             response = requests.post(
                 service_url,
@@ -0,0 +1,123 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from ibis.expr.types import Table as IbisQuery
+
+from insights.cache_utils import make_digest
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+    WAREHOUSE_DB_NAME,
+    Warehouse,
+)
+from insights.insights.doctype.insights_data_source_v3.ibis_utils import (
+    IbisQueryBuilder,
+    get_backend_name,
+)
+from insights.insights.doctype.insights_query_v3.insights_query_v3 import (
+    set_adhoc_filters,
+)
+
+SHARED_TABLE_PREFIX = "__insights_shared_"
+# operations from the first aggregation onwards are specific to each chart
+AGGREGATE_OPERATIONS = ("summarize", "pivot_wider")
+# a shared prefix over a table is only worth materializing if it reduces the rows of the table,
+# otherwise the whole table would be copied on every request. prefixes over a query are always
+# materialized, since the query would otherwise be executed once for every chart
+REDUCING_OPERATIONS = ("filter", "filter_group", "join", "summarize", "limit")
+
+
+def share_common_prefixes(queries: dict[str, tuple[Document, dict]]) -> dict[str, IbisQuery]:
+    """
+    Rebuilds queries that start with the same operations over a shared temporary table.
+
+    `queries` maps a key to a `(query doc, adhoc filters)` pair. Queries that read from the warehouse
+    and aggregate the same source with the same filters are grouped, the operations they have in common
+    before the aggregation are executed once into a temporary table in the warehouse, and the remaining
+    operations of each query are applied over that table. Returns the rebuilt queries by key,
+    queries that don't share operations with another query are not returned.
+    """
+    groups = {}
+    for key, (doc, adhoc_filters) in queries.items():
+        if doc.use_live_connection:
+            continue
+
+        operations = frappe.parse_json(doc.operations) or []
+        aggregate_idx = next(
+            (idx for idx, op in enumerate(operations) if op.get("type") in AGGREGATE_OPERATIONS),
+            None,
+        )
+        if not aggregate_idx:
+            continue
+
+        # filters on the query itself are applied after its own operations, so they are not shared
+        shared_filters = {name: f for name, f in (adhoc_filters or {}).items() if name != doc.name}
+        group_key = make_digest(operations[0], shared_filters)
+        groups.setdefault(group_key, []).append((key, doc, adhoc_filters, operations[:aggregate_idx]))
+
+    shared = {}
+    for items in groups.values():
+        if len(items) < 2:
+            continue
+
+        prefix = get_common_prefix([operations for *_, operations in items])
+        _, doc, adhoc_filters, _ = items[0]
+        shared_filters = {name: f for name, f in (adhoc_filters or {}).items() if name != doc.name}
+        if not is_worth_materializing(prefix, shared_filters):
+            continue
+
+        try:
+            table = materialize(prefix, shared_filters)
+        except Exception:
+            frappe.log_error(title="Failed to materialize shared query")
+            continue
+
+        if table is None:
+            continue
+
+        for key, doc, adhoc_filters, _ in items:
+            try:
+                with set_adhoc_filters(adhoc_filters):
+                    builder = IbisQueryBuilder(doc)
+                    shared[key] = builder.build(base_query=table, start=len(prefix))
+            except Exception:
+                # the query is executed as it is
+                continue
+
+    return shared
+
+
+def get_common_prefix(operation_lists: list[list]) -> list:
+    prefix = []
+    for operations in zip(*operation_lists, strict=False):
+        if any(op != operations[0] for op in operations[1:]):
+            break
+        prefix.append(operations[0])
+    return prefix
+
+
+def is_worth_materializing(operations: list, shared_filters: dict) -> bool:
+    source_table = (operations[0].get("table") or {}) if operations else {}
+    if source_table.get("type") == "query" or any(shared_filters.values()):
+        return True
+    return any(op.get("type") in REDUCING_OPERATIONS for op in operations[1:])
+
+
+def materialize(operations: list, adhoc_filters: dict) -> IbisQuery | None:
+    doc = frappe._dict(
+        name=None,
+        title="Shared Query",
+        operations=operations,
+        use_live_connection=0,
+    )
+    with set_adhoc_filters(adhoc_filters):
+        query = IbisQueryBuilder(doc).build()
+
+    backends, _ = query._find_backends()
+    if len(backends) != 1 or get_backend_name(backends[0]) != WAREHOUSE_DB_NAME:
+        # copying the rows of a remote query into the warehouse would cost more than running it again
+        return None
+
+    # temporary tables only live as long as the connection of the current request
+    table_name = SHARED_TABLE_PREFIX + make_digest(operations, adhoc_filters)
+    return Warehouse().db.create_table(table_name, query, temp=True, overwrite=True)
@@ -38,8 +38,9 @@ class TestInsightsDashboardv3(FrappeTestCase):
 
         frappe.conf.preview_generator_url = "http://example.com/preview"
 
+        # requests is imported when a preview is generated
         with patch(
-            "insights.insights.doctype.insights_dashboard_v3.insights_dashboard_v3.requests.post",
+            "requests.post",
             return_value=fake_response,
         ) as post:
             result = get_page_preview("https://example.com", headers={"X-Test": "1"})
@@ -50,8 +51,9 @@ class TestInsightsDashboardv3(FrappeTestCase):
     def test_get_page_preview_falls_back_to_placeholder_on_service_error(self):
         frappe.conf.preview_generator_url = "http://example.com/preview"
 
+        # requests is imported when a preview is generated
         with patch(
-            "insights.insights.doctype.insights_dashboard_v3.insights_dashboard_v3.requests.post",
+            "requests.post",
             side_effect=Exception("boom"),
         ):
             content = get_page_preview("https://example.com")
@@ -0,0 +1,142 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+import frappe
+import ibis
+import numpy as np
+import pandas as pd
+from frappe.utils.data import flt
+from ibis import BaseBackend
+from ibis.expr.types import Table as IbisQuery
+
+from insights.insights.doctype.insights_data_source_v3.connection_pool import (
+    connection_pool,
+    disconnect,
+)
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+    WAREHOUSE_DB_NAME,
+    Warehouse,
+)
+from insights.insights.doctype.insights_data_source_v3.ibis_utils import (
+    get_portable_backend_name,
+    limit_query,
+)
+from insights.utils import InsightsDataSourcev3
+
+MAX_CONCURRENT_QUERIES = 4
+
+
+def execute_ibis_queries(
+    queries: dict[str, tuple[IbisQuery, int]],
+    max_workers=MAX_CONCURRENT_QUERIES,
+) -> Iterator[tuple[str, pd.DataFrame | None, float, Exception | None]]:
+    """
+    Executes independent queries concurrently and yields `(key, result, time_taken, error)`
+    in the order the queries complete.
+
+    `queries` maps a key to a `(query, limit)` pair. Queries are split into lanes that run in parallel,
+    each lane runs its queries one after the other on a single connection. The first lane of a backend
+    uses the connection the queries were built with, the other lanes use extra connections
+    which are only opened for queries that can run on any connection to the same backend.
+    """
+    if not queries:
+        return
+
+    lanes = []
+    release_connections = []
+    results = Queue()
+
+    try:
+        lanes = get_lanes(queries, max_workers, release_connections)
+        with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+            for db, items in lanes:
+                executor.submit(run_lane, db, items, results)
+
+            # results are yielded from this thread since frappe.local is not shared with the workers
+            for _ in range(len(queries)):
+                yield results.get()
+    finally:
+        for release in release_connections:
+            release()
+
+
+def get_lanes(queries, max_workers, release_connections):
+    by_backend = {}
+    for key, (query, limit) in queries.items():
+        query = limit_query(query, limit)
+        backends, _ = query._find_backends()
+        backend = backends[0] if len(backends) == 1 else None
+        by_backend.setdefault(id(backend), []).append((key, query))
+
+    lanes_per_backend = max(1, max_workers // len(by_backend))
+    lanes = []
+    for items in by_backend.values():
+        # queries that can't be moved to another connection stay on the first lane
+        first_lane = (None, [])
+        portable = []
+        backend_name = None
+        for key, query in items:
+            name = get_portable_backend_name(query) if lanes_per_backend > 1 else None
+            if name:
+                backend_name = name
+                portable.append((key, query))
+            else:
+                first_lane[1].append((key, query, None, None))
+
+        lanes.append(first_lane)
+        extra_lanes = []
+        for _ in range(min(lanes_per_backend - 1, len(portable))):
+            db = connect(backend_name, release_connections)
+            if db is None:
+                break
+            extra_lanes.append((db, []))
+        lanes.extend(extra_lanes)
+
+        # spread the portable queries over all the lanes of the backend
+        backend_lanes = [first_lane, *extra_lanes]
+        for idx, (key, query) in enumerate(portable):
+            db, lane_items = backend_lanes[idx % len(backend_lanes)]
+            if db is None:
+                lane_items.append((key, query, None, None))
+            else:
+                lane_items.append((key, query, ibis.to_sql(query), query.schema()))
+
+    return [lane for lane in lanes if lane[1]]
+
+
+def connect(backend_name: str, release_connections: list) -> BaseBackend | None:
+    # opens an extra connection to the backend of a query, connections to
+    # local databases other than the warehouse are not opened since they hold file locks
+    if backend_name == WAREHOUSE_DB_NAME:
+        db = ibis.duckdb.connect(Warehouse().db_path, read_only=True)
+        release_connections.append(lambda: disconnect(db))
+        return db
+
+    data_source = InsightsDataSourcev3.get_doc(backend_name)
+    if not data_source.is_pooled():
+        return None
+
+    pool_key = (frappe.local.site, data_source.name)
+    pool_version = str(data_source.modified)
+    db = connection_pool.checkout(pool_key, pool_version) or data_source._connect()
+    release_connections.append(lambda: connection_pool.checkin(pool_key, pool_version, db))
+    return db
+
+
+def run_lane(db: BaseBackend | None, items: list, results: Queue):
+    for key, query, sql, schema in items:
+        start = time.monotonic()
+        try:
+            if db is not None:
+                query = db.sql(sql, schema=schema)
+            result = query.execute()
+            if isinstance(result, pd.DataFrame):
+                result = result.replace({pd.NaT: None, np.nan: None})
+            results.put((key, result, flt(time.monotonic() - start, 3), None))
+        except Exception as e:
+            results.put((key, None, 0, e))
@@ -0,0 +1,103 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import threading
+import time
+
+from ibis import BaseBackend
+
+# connections are only pooled for remote databases,
+# local databases are cheap to open and hold file locks while open
+POOLED_DATABASE_TYPES = ("MariaDB", "PostgreSQL", "ClickHouse", "MSSQL")
+POOL_MAX_SIZE = 4
+POOL_IDLE_TIMEOUT = 5 * 60
+
+
+class ConnectionPool:
+    """
+    Per process pool of idle ibis backends, keyed by (site, data source).
+
+    Connections are checked out at the start of a request and checked back in
+    by `after_request` instead of being disconnected, so that the next request
+    can skip the connection handshake and session setup.
+    """
+
+    def __init__(self, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        # key -> (version, [(db, released_at), ...])
+        self.idle = {}
+
+    def checkout(self, key, version) -> BaseBackend | None:
+        while True:
+            with self.lock:
+                db = self._pop(key, version)
+            if db is None:
+                return None
+            if is_alive(db):
+                return db
+            disconnect(db)
+
+    def checkin(self, key, version, db: BaseBackend):
+        reset_session(db)
+        with self.lock:
+            pool_version, connections = self.idle.get(key, (version, []))
+            if pool_version == version and len(connections) < self.max_size:
+                connections.append((db, time.monotonic()))
+                self.idle[key] = (version, connections)
+                return
+        disconnect(db)
+
+    def invalidate(self, key):
+        with self.lock:
+            _, connections = self.idle.pop(key, (None, []))
+        for db, _ in connections:
+            disconnect(db)
+
+    def _pop(self, key, version):
+        pool_version, connections = self.idle.get(key, (version, []))
+        if pool_version != version:
+            # data source was modified, drop the connections made with the old settings
+            self.idle.pop(key, None)
+            for db, _ in connections:
+                disconnect(db)
+            return None
+
+        now = time.monotonic()
+        while connections:
+            db, released_at = connections.pop()
+            if now - released_at < self.idle_timeout:
+                return db
+            disconnect(db)
+        return None
+
+
+def is_alive(db: BaseBackend) -> bool:
+    try:
+        result = db.raw_sql("SELECT 1")
+        if hasattr(result, "close"):
+            result.close()
+        return True
+    except Exception:
+        return False
+
+
+def reset_session(db: BaseBackend):
+    # end any open transaction so the next request doesn't read from a stale snapshot
+    con = getattr(db, "con", None)
+    if hasattr(con, "rollback"):
+        try:
+            con.rollback()
+        except Exception:
+            pass
+
+
+def disconnect(db: BaseBackend):
+    try:
+        db.disconnect()
+    except Exception:
+        pass
+
+
+connection_pool = ConnectionPool()
@@ -1,20 +1,48 @@
 import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import pairwise
 
 import frappe
 import frappe.utils
 import ibis
 import ibis.backends
 import ibis.backends.duckdb
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import sqlglot as sg
 from frappe.query_builder.functions import IfNull
 from frappe.utils import get_files_path
 from frappe.utils.background_jobs import is_job_enqueued
 from ibis import BaseBackend, _
+from ibis.common.exceptions import TableNotFound
 from ibis.expr.types import Expr
 
 from insights import create_toast
+from insights.insights.doctype.insights_data_source_v3.result_cache import bump_table_version
 from insights.utils import InsightsDataSourcev3, InsightsTablev3
 
 WAREHOUSE_DB_NAME = "insights.duckdb"
+ROW_GROUP_SIZE = 100_000
+# backends that fetch the rows of a batch as arrow record batches, the others (like mysql)
+# load the whole batch into a dataframe first, which takes a few times its arrow size
+STREAMING_BACKENDS = ("duckdb",)
+DATAFRAME_FETCH_OVERHEAD = 3
+
+# imports hold the write lock on the warehouse db while they create their views, requests that
+# open a read connection meanwhile wait for the lock up to this many times, in seconds
+READ_LOCK_RETRIES = 25
+READ_LOCK_RETRY_INTERVAL = 0.2
+
+# materialized query results are stored like the tables of a data source with this name
+MATERIALIZED_QUERY_SOURCE = "Insights Query v3"
+
+# column used to find new rows in each incremental sync mode
+WATERMARK_COLUMNS = {
+    "Append": "creation",
+    "Upsert": "modified",
+}
 
 
 class Warehouse:
@@ -29,7 +57,12 @@ class Warehouse:
             ddb.disconnect()
 
         if WAREHOUSE_DB_NAME not in frappe.local.insights_db_connections:
-            ddb = ibis.duckdb.connect(self.db_path, read_only=True)
+            ddb = connect_to_warehouse(
+                self.db_path,
+                read_only=True,
+                retries=READ_LOCK_RETRIES,
+                retry_interval=READ_LOCK_RETRY_INTERVAL,
+            )
             frappe.local.insights_db_connections[WAREHOUSE_DB_NAME] = ddb
 
         return frappe.local.insights_db_connections[WAREHOUSE_DB_NAME]
@@ -37,6 +70,99 @@ class Warehouse:
     def get_table(self, data_source: str, table_name: str) -> "WarehouseTable":
         return WarehouseTable(data_source, table_name)
 
+    def get_views(self) -> set[str]:
+        # persistent views created for the imported tables, excludes the temporary
+        # views & tables that are registered on the current connection
+        rows = self.db.raw_sql("SELECT view_name FROM duckdb_views() WHERE NOT temporary").fetchall()
+        return {row[0] for row in rows}
+
+    def create_view(self, table_name: str, parquet_filepath: str):
+        # the view is stored in the warehouse db so that queries don't have to
+        # register the parquet file again with `read_parquet` on every request
+        table_name = sg.to_identifier(table_name, quoted=True).sql("duckdb")
+        source = sg.exp.Literal.string(get_parquet_source(parquet_filepath)).sql("duckdb")
+
+        ddb = self.connect_for_write()
+        try:
+            ddb.raw_sql(
+                f"CREATE OR REPLACE VIEW {table_name} AS "
+                f"SELECT * FROM read_parquet({source}, hive_partitioning = false)"
+            )
+        finally:
+            ddb.disconnect()
+
+    def drop_view(self, table_name: str):
+        table_name = sg.to_identifier(table_name, quoted=True).sql("duckdb")
+        ddb = self.connect_for_write()
+        try:
+            ddb.raw_sql(f"DROP VIEW IF EXISTS {table_name}")
+        finally:
+            ddb.disconnect()
+
+    def store_query_results(self, query_name: str, query: Expr) -> str:
+        """
+        Writes the results of a query to a parquet file in the warehouse and creates a view over it.
+        Returns the name of the view.
+        """
+        table_name = get_warehouse_table_name(MATERIALIZED_QUERY_SOURCE, query_name)
+        path = get_parquet_filepath(MATERIALIZED_QUERY_SOURCE, query_name)
+        tmp_path = f"{path}.tmp"
+        try:
+            write_parquet_batch(query, tmp_path)
+            replace_path(tmp_path, path)
+        finally:
+            remove_path(tmp_path)
+
+        try:
+            self.create_view(table_name, path)
+        except Exception:
+            # the results can still be read from the parquet file
+            frappe.log_error(title=f"Failed to create warehouse view for {query_name}")
+        return table_name
+
+    def get_query_results(self, query_name: str) -> Expr | None:
+        path = get_parquet_filepath(MATERIALIZED_QUERY_SOURCE, query_name)
+        if not os.path.exists(path):
+            return None
+
+        table_name = get_warehouse_table_name(MATERIALIZED_QUERY_SOURCE, query_name)
+        try:
+            return self.db.table(table_name)
+        except TableNotFound:
+            return read_warehouse_parquet(self.db, path, table_name=table_name)
+
+    def remove_query_results(self, query_name: str):
+        self.drop_view(get_warehouse_table_name(MATERIALIZED_QUERY_SOURCE, query_name))
+        remove_path(get_parquet_filepath(MATERIALIZED_QUERY_SOURCE, query_name))
+
+    def connect_for_write(self, retries: int = 30) -> BaseBackend:
+        # duckdb can't open a write connection to a file that the same process has open as read-only
+        self.close_read_connection()
+
+        # web workers hold short lived read-only connections to the warehouse db,
+        # which prevents a write connection until they are closed
+        return connect_to_warehouse(self.db_path, retries=retries)
+
+    def close_read_connection(self):
+        # the next use of `db` opens a new connection
+        connections = getattr(frappe.local, "insights_db_connections", None) or {}
+        if ddb := connections.pop(WAREHOUSE_DB_NAME, None):
+            ddb.disconnect()
+
+
+def connect_to_warehouse(
+    db_path: str, read_only: bool = False, retries: int = 1, retry_interval: float = 1
+) -> BaseBackend:
+    # duckdb allows either one write connection or any number of read-only connections to a file,
+    # so a connection is retried while another process holds the lock
+    for attempt in range(retries):
+        try:
+            return ibis.duckdb.connect(db_path, read_only=read_only)
+        except Exception as e:
+            if "lock" not in str(e).lower() or attempt == retries - 1:
+                raise
+            time.sleep(retry_interval)
+
 
 class WarehouseTable:
     def __init__(self, data_source: str, table_name: str):
@@ -73,23 +199,27 @@ class WarehouseTable:
                     f"{self.table_name} of {self.data_source} is not imported to the data warehouse."
                 )
 
-        if os.path.exists(self.parquet_filepath):
-            return self.warehouse.db.read_parquet(self.parquet_filepath, table_name=self.warehouse_table_name)
-
-        return self.warehouse.db.table(self.warehouse_table_name)
+        try:
+            return self.warehouse.db.table(self.warehouse_table_name)
+        except TableNotFound:
+            # imported before the view was created or the view could not be created
+            return read_warehouse_parquet(
+                self.warehouse.db, self.parquet_filepath, table_name=self.warehouse_table_name
+            )
 
     def get_remote_table(self) -> Expr:
         ds = InsightsDataSourcev3.get_doc(self.data_source)
         return ds.get_ibis_table(self.table_name)
 
-    def enqueue_import(self):
-        importer = WarehouseTableImporter(self)
+    def enqueue_import(self, incremental: bool = False):
+        importer = WarehouseTableImporter(self, incremental=incremental)
         importer.enqueue_import()
 
 
 class WarehouseTableImporter:
-    def __init__(self, table: WarehouseTable):
+    def __init__(self, table: WarehouseTable, incremental: bool = False):
         self.table = table
+        self.incremental = incremental
         self.remote_table = None
         self.primary_key = ""
         self.warehouse_table_name = ""
@@ -129,6 +259,7 @@ class WarehouseTableImporter:
             fn="insights.insights.doctype.insights_data_source_v3.data_warehouse._start_table_import",
             data_source=self.table.data_source,
             table_name=self.table.table_name,
+            incremental=self.incremental,
             queue="long",
             timeout=6000,
             job_id=job_id,
@@ -183,13 +314,32 @@ class WarehouseTableImporter:
         self.settings.before_import_script = (
             frappe.get_value("Insights Table v3", self.table.table_doc_name, "before_import_script") or ""
         )
+        sync_mode, watermark, partition_column = frappe.get_value(
+            "Insights Table v3",
+            self.table.table_doc_name,
+            ["sync_mode", "watermark", "partition_column"],
+        ) or (None, None, None)
+        self.settings.partition_column = partition_column
+        self.settings.sync_mode = sync_mode or "Full"
+        self.settings.watermark_column = WATERMARK_COLUMNS.get(self.settings.sync_mode)
+        self.settings.watermark = watermark
+        self.settings.incremental = bool(
+            self.incremental
+            and self.settings.watermark_column
+            and self.settings.watermark
+            and os.path.exists(self.table.parquet_filepath)
+        )
         self.settings.memory_limit = (
             frappe.db.get_single_value("Insights Settings", "max_memory_usage") or 512
         )
+        self.settings.import_workers = max(
+            frappe.db.get_single_value("Insights Settings", "import_workers") or 1, 1
+        )
         self.log.db_set(
             {
                 "row_limit": self.settings.row_limit,
                 "memory_limit": self.settings.memory_limit,
+                "incremental": self.settings.incremental,
             },
             commit=True,
         )
@@ -199,14 +349,16 @@ class WarehouseTableImporter:
 
         if hasattr(self.remote_table, "creation"):
             self.primary_key = "creation"
-            self.remote_table = self.remote_table.order_by(ibis.desc("creation"))
         elif hasattr(self.remote_table, "timestamp"):
             self.primary_key = "timestamp"
-            self.remote_table = self.remote_table.order_by(ibis.desc("timestamp"))
         else:
             self.primary_key = "__row_number"
             self.remote_table = self.remote_table.mutate(__row_number=ibis.row_number())
 
+        if self.primary_key != "__row_number" and not self.settings.incremental:
+            # the newest rows are imported when the table has more rows than the row limit
+            self.remote_table = self.remote_table.order_by(ibis.desc(self.primary_key))
+
         if self.settings.before_import_script:
             from .ibis_utils import exec_with_return
 
@@ -214,9 +366,43 @@ class WarehouseTableImporter:
                 self.settings.before_import_script, {"table": self.remote_table}
             )
 
+        if self.settings.incremental:
+            self.apply_watermark()
+
         self.remote_table = self.remote_table.limit(self.settings.row_limit)
         self.log.db_set("query", ibis.to_sql(self.remote_table), commit=True)
 
+    def apply_watermark(self):
+        column = self.settings.watermark_column
+        columns = [col for col in self.remote_table.columns if col != "__row_number"]
+        existing_columns = get_parquet_columns(self.table.parquet_filepath)
+
+        if (
+            column not in columns
+            or columns != existing_columns
+            or (self.settings.sync_mode == "Upsert" and "name" not in columns)
+        ):
+            self.settings.incremental = False
+            self.log.db_set("incremental", 0, commit=True)
+            self.log.log_output(
+                "Table columns have changed or the sync columns are missing. Importing the full table.",
+                commit=True,
+            )
+            if self.primary_key != "__row_number":
+                self.remote_table = self.remote_table.order_by(ibis.desc(self.primary_key))
+            return
+
+        self.log.log_output(f"Importing rows with {column} after {self.settings.watermark}", commit=True)
+        watermark = ibis.literal(self.settings.watermark).cast(self.remote_table[column].type())
+        if self.settings.sync_mode == "Upsert":
+            # upserted rows replace the existing ones, so re-fetching the boundary rows is harmless
+            self.remote_table = self.remote_table.filter(_[column] >= watermark)
+        else:
+            self.remote_table = self.remote_table.filter(_[column] > watermark)
+        # the oldest new rows are imported first, so that when there are more new rows than the
+        # row limit, the watermark stops before the rows that are left for the next sync
+        self.remote_table = self.remote_table.order_by(column)
+
     def start_batch_import(self):
         self.warehouse_table_name = self.table.warehouse_table_name
         self.warehouse_folder = get_warehouse_folder_path()
@@ -224,11 +410,17 @@ class WarehouseTableImporter:
 
         try:
             batch_size = self.calculate_batch_size()
-            self.process_batches(batch_size)
+            if self.settings.import_workers > 1:
+                self.process_partitions(batch_size)
+            else:
+                self.process_batches(batch_size)
             self.merge_batches()
+            self.create_view()
+            bump_table_version(self.warehouse_table_name)
             self.update_insights_table()
             self.log.status = "Completed"
             self.log.log_output("Import completed successfully.", commit=True)
+            self.enqueue_cache_warmup()
         except Exception as e:
             self.log.status = "Failed"
             self.log.log_output(f"Error: \n{e}", commit=True)
@@ -237,20 +429,35 @@ class WarehouseTableImporter:
             self._cleanup()
 
     def calculate_batch_size(self) -> int:
-        sample_size = 10
-        sample_rows = self.remote_table.head(sample_size).execute()
-        total_size = sum(sample_rows[column].memory_usage(deep=True) for column in sample_rows.columns)
-        row_size = total_size / sample_size / (1024 * 1024)
-        batch_size = int(self.settings.memory_limit / row_size)
+        sample_size = 100
+        sample_rows = self.remote_table.head(sample_size).to_pyarrow()
+        row_size = sample_rows.nbytes / max(sample_rows.num_rows, 1)
+        self.settings.fetch_overhead = (
+            1 if self.remote_table._find_backend().name in STREAMING_BACKENDS else DATAFRAME_FETCH_OVERHEAD
+        )
+        batch_size = self.get_batch_size(row_size)
         self.log.db_set(
             {
-                "row_size": row_size * 1024,
+                "row_size": row_size / 1024,
                 "batch_size": batch_size,
             },
             commit=True,
         )
         return batch_size
 
+    def get_batch_size(self, row_size: float) -> int:
+        # each worker holds one batch in memory at a time
+        memory_limit = self.settings.memory_limit * 1024 * 1024 / self.settings.import_workers
+        row_size = row_size * (self.settings.fetch_overhead or 1)
+        return max(int(memory_limit / max(row_size, 1)), 1)
+
+    def adjust_batch_size(self, batch_size: int, metadata: dict) -> int:
+        # the sampled row size is only an estimate, shrink the batches
+        # if the rows fetched so far turned out to be larger
+        if not metadata["count"]:
+            return batch_size
+        return min(batch_size, self.get_batch_size(metadata["nbytes"] / metadata["count"]))
+
     def process_batches(self, batch_size: int):
         remote_table = self.remote_table.order_by(self.primary_key)
         batch_number = 0
@@ -258,58 +465,183 @@ class WarehouseTableImporter:
         while True:
             self.log.log_output(f"Processing batch: {batch_number + 1}", commit=True)
             batch = remote_table.head(batch_size)
-            path = self.create_parquet_file(batch, batch_number)
+            path = self.get_batch_path(batch_number)
+            self.log.log_output(f"Batch Query: \n{ibis.to_sql(batch)}", commit=True)
             self.imported_batch_paths.append(path)
 
-            metadata = self.get_batch_metadata(path)
+            metadata = write_parquet_batch(batch, path, self.primary_key)
+            self.log.log_output(
+                f"Rows: {metadata['count']}\nBookmark: {metadata['max_primary_key']}",
+                commit=True,
+            )
             if metadata["count"] < batch_size:
                 break
 
             remote_table = remote_table.filter(_[self.primary_key] > metadata["max_primary_key"])
+            batch_size = self.adjust_batch_size(batch_size, metadata)
             batch_number += 1
 
-    def create_parquet_file(self, batch: Expr, batch_number: int) -> str:
-        batch_file_name = f"{self.warehouse_table_name}_{batch_number}.parquet"
-        path = os.path.join(self.warehouse_folder, batch_file_name)
-        self.log.log_output(f"Batch Query: \n{ibis.to_sql(batch)}", commit=True)
-        batch.to_parquet(path, compression="snappy")
-        return path
+    def process_partitions(self, batch_size: int):
+        partitions = self.get_partitions()
+        if len(partitions) < 2:
+            self.log.log_output("Table cannot be partitioned, importing sequentially.", commit=True)
+            return self.process_batches(batch_size)
 
-    def get_batch_metadata(self, path: str) -> dict:
-        ddb = ibis.duckdb.connect(":memory:")
-        batch = ddb.read_parquet(path)
-        metadata = (
-            batch.aggregate(
-                count=_.count(),
+        self.log.log_output(f"Importing {len(partitions)} partitions in parallel", commit=True)
+
+        # ibis backends are not thread-safe, so each partition gets its own connection
+        ds = InsightsDataSourcev3.get_doc(self.table.data_source)
+        connections = [ds._connect() for _ in partitions]
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+                futures = {
+                    executor.submit(self.import_partition, db, idx, condition, batch_size): idx
+                    for idx, (db, condition) in enumerate(zip(connections, partitions, strict=True))
+                }
+                # logging is done from this thread since frappe.db is not shared with the workers
+                for future in as_completed(futures):
+                    batches, rows = future.result()
+                    self.log.log_output(
+                        f"Partition {futures[future] + 1}: {rows} rows in {batches} batches",
+                        commit=True,
+                    )
+        finally:
+            for db in connections:
+                try:
+                    db.disconnect()
+                except Exception:
+                    pass
+
+    def get_partitions(self) -> list[Expr]:
+        if self.primary_key == "__row_number":
+            # row numbers are not stable across queries
+            return []
+
+        bounds = (
+            self.remote_table.aggregate(
+                min_primary_key=_[self.primary_key].min(),
                 max_primary_key=_[self.primary_key].max(),
             )
             .execute()
             .to_records(index=False)[0]
         )
-        self.log.log_output(
-            f"Rows: {metadata['count']}\nBookmark: {metadata['max_primary_key']}",
-            commit=True,
+        bounds = get_partition_bounds(
+            bounds["min_primary_key"],
+            bounds["max_primary_key"],
+            self.settings.import_workers,
         )
-        ddb.disconnect()
-        return metadata
+        if not bounds:
+            return []
+
+        self.log.log_output(f"Partition Bounds: \n{', '.join(map(str, bounds))}", commit=True)
+
+        key = _[self.primary_key]
+        partitions = [key.isnull() | (key < bounds[0])]
+        for lower, upper in pairwise(bounds):
+            partitions.append((key >= lower) & (key < upper))
+        partitions.append(key >= bounds[-1])
+        return partitions
+
+    def import_partition(self, db: BaseBackend, partition_number: int, condition: Expr, batch_size: int):
+        # runs in a worker thread: must not use frappe.db or frappe.local
+        remote_table = self.remote_table.filter(condition).order_by(self.primary_key)
+        batch_number = 0
+        rows = 0
+
+        while True:
+            batch = db.sql(ibis.to_sql(remote_table.head(batch_size)))
+            path = self.get_batch_path(f"{partition_number}_{batch_number}")
+            self.imported_batch_paths.append(path)
+
+            metadata = write_parquet_batch(batch, path, self.primary_key)
+            rows += metadata["count"]
+            if metadata["count"] < batch_size:
+                break
+
+            remote_table = remote_table.filter(_[self.primary_key] > metadata["max_primary_key"])
+            batch_size = self.adjust_batch_size(batch_size, metadata)
+            batch_number += 1
+
+        return batch_number + 1, rows
+
+    def get_batch_path(self, suffix) -> str:
+        batch_file_name = f"{self.warehouse_table_name}_{suffix}.parquet"
+        return os.path.join(self.warehouse_folder, batch_file_name)
 
     def merge_batches(self):
         ddb = ibis.duckdb.connect(":memory:")
         merged = ddb.read_parquet(self.imported_batch_paths, table_name=self.warehouse_table_name)
-        path = os.path.join(self.warehouse_folder, f"{self.warehouse_table_name}.parquet")
+        path = self.table.parquet_filepath
         if hasattr(merged, "__row_number"):
             merged = merged.drop("__row_number")
-        merged.to_parquet(path, compression="snappy")
 
+        rows_imported = int(merged.count().execute())
+        if self.settings.incremental:
+            merged = self.merge_with_existing(ddb, merged)
+
+        # write to a temporary path first since the existing file may be read during the merge
+        tmp_path = f"{path}.tmp"
+        remove_path(tmp_path)
+        self.write_parquet(ddb, merged, tmp_path)
+        replace_path(tmp_path, path)
+
+        merged = read_warehouse_parquet(ddb, path)
         total_rows = int(merged.count().execute())
+        if self.settings.watermark_column and self.settings.watermark_column in merged.columns:
+            self.settings.watermark = (
+                merged[self.settings.watermark_column].max().cast("string").execute()
+                or self.settings.watermark
+            )
+
         self.log.parquet_file = path
-        self.log.rows_imported = total_rows
+        self.log.rows_imported = rows_imported
+        self.log.watermark = self.settings.watermark
         self.log.log_output(
-            f"Total Batches: {len(self.imported_batch_paths)}\nTotal Rows: {total_rows}",
+            f"Total Batches: {len(self.imported_batch_paths)}\nRows Imported: {rows_imported}\nTotal Rows: {total_rows}",
             commit=True,
         )
         ddb.disconnect()
 
+    def write_parquet(self, ddb: BaseBackend, table: Expr, path: str):
+        column = self.settings.partition_column
+        if not column:
+            table.to_parquet(path, compression="snappy")
+            return
+
+        if column not in table.columns or not table[column].type().is_temporal():
+            self.log.log_output(
+                f"Partition column {column} is not a date column of the table. Skipping partitioning.",
+                commit=True,
+            )
+            table.to_parquet(path, compression="snappy")
+            return
+
+        # one directory per month, sorted by the partition column so that the row group
+        # statistics are narrow enough for duckdb to skip most of them on date range filters
+        table = table.mutate(__month=table[column].strftime("%Y-%m")).order_by(column)
+        sql = ibis.to_sql(table, dialect="duckdb")
+        path = path.replace("'", "''")
+        ddb.raw_sql(
+            f"COPY ({sql}) TO '{path}' "
+            f"(FORMAT PARQUET, COMPRESSION SNAPPY, PARTITION_BY (__month), ROW_GROUP_SIZE {ROW_GROUP_SIZE})"
+        )
+        self.log.log_output(f"Partitioned by month of {column}", commit=True)
+
+    def create_view(self):
+        try:
+            self.table.warehouse.create_view(self.warehouse_table_name, self.table.parquet_filepath)
+        except Exception as e:
+            # the table can still be queried from the parquet file
+            self.log.log_output(f"Failed to create warehouse view: \n{e}", commit=True)
+
+    def merge_with_existing(self, ddb: BaseBackend, new_rows: Expr) -> Expr:
+        existing = read_warehouse_parquet(ddb, self.table.parquet_filepath)
+        new_rows = new_rows.select(existing.columns).cast(existing.schema())
+        if self.settings.sync_mode == "Upsert":
+            existing = existing.anti_join(new_rows, "name")
+        return existing.union(new_rows)
+
     def update_log(self):
         self.log.db_set(
             {
@@ -328,8 +660,19 @@ class WarehouseTableImporter:
         )
         t.stored = 1
         t.last_synced_on = frappe.utils.now()
+        t.watermark = self.settings.watermark if self.settings.watermark_column else None
         t.save()
 
+    def enqueue_cache_warmup(self):
+        from insights.insights.doctype.insights_dashboard_v3.cache_warmup import (
+            enqueue_cache_warmup,
+        )
+
+        try:
+            enqueue_cache_warmup(self.table.data_source, self.table.table_name)
+        except Exception:
+            frappe.log_error(title="Failed to enqueue dashboard cache warmup")
+
     def _cleanup(self):
         for path in self.imported_batch_paths:
             if os.path.exists(path):
@@ -337,12 +680,91 @@ class WarehouseTableImporter:
 
 
 # called by background job
-def _start_table_import(data_source: str, table_name: str):
+def _start_table_import(data_source: str, table_name: str, incremental: bool = False):
     table = WarehouseTable(data_source, table_name)
-    importer = WarehouseTableImporter(table)
+    importer = WarehouseTableImporter(table, incremental=incremental)
     importer.start_import()
 
 
+def write_parquet_batch(batch: Expr, path: str, primary_key: str | None = None) -> dict:
+    """
+    Writes the batch from the remote database into a parquet file, one row group at a time.
+    Backends in `STREAMING_BACKENDS` hold at most one row group in memory, the others fetch the
+    whole batch before it is split into row groups, so the batch size is what bounds the memory.
+    Returns the row count, the max value of the primary key (if any) and the size of the fetched rows.
+    """
+    metadata = {"count": 0, "max_primary_key": None, "nbytes": 0}
+
+    reader = batch.to_pyarrow_batches(chunk_size=ROW_GROUP_SIZE)
+    with pq.ParquetWriter(path, reader.schema, compression="snappy") as writer:
+        for record_batch in reader:
+            if not record_batch.num_rows:
+                continue
+
+            writer.write_batch(record_batch, row_group_size=ROW_GROUP_SIZE)
+            metadata["count"] += record_batch.num_rows
+            metadata["nbytes"] += record_batch.nbytes
+
+            if not primary_key:
+                continue
+
+            max_primary_key = pc.max(record_batch.column(primary_key)).as_py()
+            if max_primary_key is not None and (
+                metadata["max_primary_key"] is None or max_primary_key > metadata["max_primary_key"]
+            ):
+                metadata["max_primary_key"] = max_primary_key
+
+    return metadata
+
+
+def get_parquet_source(path: str) -> str:
+    # partitioned tables are stored as a directory of hive partitions, the partition key is only
+    # used for the directory layout, so it is not read back as a column
+    if os.path.isdir(path):
+        return os.path.join(path, "**", "*.parquet")
+    return path
+
+
+def read_warehouse_parquet(ddb: BaseBackend, path: str, table_name: str | None = None) -> Expr:
+    return ddb.read_parquet(get_parquet_source(path), table_name=table_name, hive_partitioning=False)
+
+
+def remove_path(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def replace_path(src: str, dst: str):
+    # files are replaced atomically, directories can't be renamed over an existing path
+    if os.path.isdir(src) or os.path.isdir(dst):
+        remove_path(dst)
+    os.replace(src, dst)
+
+
+def get_parquet_columns(path: str) -> list[str]:
+    ddb = ibis.duckdb.connect(":memory:")
+    columns = list(read_warehouse_parquet(ddb, path).columns)
+    ddb.disconnect()
+    return columns
+
+
+def get_partition_bounds(min_value, max_value, partitions: int) -> list:
+    # returns `partitions - 1` equally spaced split points between min & max
+    if partitions < 2 or min_value is None or max_value is None:
+        return []
+
+    try:
+        if not max_value > min_value:
+            return []
+        step = (max_value - min_value) / partitions
+        return [min_value + step * i for i in range(1, partitions)]
+    except TypeError:
+        # non-numeric & non-temporal keys can't be split into ranges
+        return []
+
+
 def get_warehouse_folder_path() -> str:
     path = os.path.realpath(get_files_path(is_private=1))
     path = os.path.join(path, "insights_data_warehouse")
@@ -1,13 +1,29 @@
+from functools import cache
+
 import frappe
 import ibis
 from ibis import selectors as s
-from jedi import Script
 
 
+class FrozenDict(frappe._dict):
+    # a registry shared by all the expressions, so expressions can't modify it for the others
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Functions can't be modified")
+
+    __setattr__ = __setitem__ = __delattr__ = __delitem__ = _readonly
+    update = setdefault = pop = popitem = clear = _readonly
+
+
+@cache
 def get_functions():
+    """
+    Returns the functions, selectors and ibis attributes available in expressions.
+
+    The registry only depends on the code, so it is built once per process and can't be modified.
+    """
     import insights.insights.doctype.insights_data_source_v3.ibis.functions as functions
 
-    context = frappe._dict()
+    context = {}
     exclude_keys = [
         "frappe",
         "ibis",
@@ -19,9 +35,7 @@ def get_functions():
         if not key.startswith("_") and key not in exclude_keys:
             context[key] = getattr(functions, key)
 
-    selectors = frappe._dict()
-    for key in get_whitelisted_selectors():
-        selectors[key] = getattr(s, key)
+    selectors = FrozenDict({key: getattr(s, key) for key in get_whitelisted_selectors()})
 
     context["s"] = selectors
     context["selectors"] = selectors
@@ -87,11 +101,9 @@ def get_functions():
         "watermark",
         "window",
     )
-    context.ibis = frappe._dict()
-    for attr in allowed_ibis_attributes:
-        context.ibis[attr] = getattr(ibis, attr)
+    context["ibis"] = FrozenDict({attr: getattr(ibis, attr) for attr in allowed_ibis_attributes})
 
-    return context
+    return FrozenDict(context)
 
 
 def get_whitelisted_selectors():
@@ -112,6 +124,9 @@ def get_function_list():
 
 @frappe.whitelist()
 def get_code_completions(code: str):
+    # only the query editor needs jedi, so it isn't loaded by the workers until then
+    from jedi import Script
+
     import_statement = """from insights.insights.doctype.insights_data_source_v3.ibis.functions import *\nfrom ibis import selectors as s"""
     code = f"{import_statement}\n\n{code}"
 
@@ -1,33 +1,52 @@
 import ast
 import re
 import time
+from contextlib import nullcontext
 from datetime import date
+from functools import lru_cache
 
 import frappe
 import ibis
 import numpy as np
 import pandas as pd
 import sqlglot as sg
-import sqlparse
 from frappe.utils.data import flt
 from frappe.utils.safe_exec import safe_eval, safe_exec
 from ibis.expr.datatypes import DataType
-from ibis.expr.operations.relations import DatabaseTable, Field
+from ibis.expr.operations.relations import (
+    DatabaseTable,
+    Field,
+    InMemoryTable,
+    SQLQueryResult,
+    SQLStringView,
+)
 from ibis.expr.types import Expr
 from ibis.expr.types import Table as IbisQuery
 
 from insights import create_toast
 from insights.cache_utils import make_digest
-from insights.insights.doctype.insights_data_source_v3.data_warehouse import Warehouse
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+    WAREHOUSE_DB_NAME,
+    Warehouse,
+)
 from insights.insights.doctype.insights_table_v3.insights_table_v3 import (
     InsightsTablev3,
+    get_permission_versions,
+    track_permission_version,
 )
 from insights.insights.query_builders.sql_functions import handle_timespan
-from insights.utils import create_execution_log
+from insights.utils import InsightsDataSourcev3, create_execution_log
 from insights.utils import deep_convert_dict_to_dict as _dict
 
 from .ibis.functions import quarter_start, week_start
 from .ibis.utils import get_functions
+from .result_cache import (
+    VERSIONED_CACHE_EXPIRY,
+    cache_results,
+    coalesce_execution,
+    get_cached_results,
+    get_table_versions,
+)
 
 
 class IbisQueryBuilder:
@@ -37,6 +56,8 @@ class IbisQueryBuilder:
         self.active_operation_idx = active_operation_idx
         self.use_live_connection = doc.use_live_connection
         self.operations = doc.operations
+        # (query, columns) of the last query that an expression was evaluated against
+        self._column_namespace = (None, {})
         self.set_operations()
 
     def set_operations(self):
@@ -64,9 +85,10 @@ class IbisQueryBuilder:
 
         self.operations = operations
 
-    def build(self) -> IbisQuery:
-        self.query = None
-        for idx, operation in enumerate(self.operations):
+    def build(self, base_query: IbisQuery | None = None, start: int = 0) -> IbisQuery:
+        # `base_query` is used as the result of the first `start` operations, which are skipped
+        self.query = base_query
+        for idx, operation in enumerate(self.operations[start:], start=start):
             try:
                 operation = _dict(operation)
                 self.query = self.perform_operation(operation)
@@ -128,7 +150,10 @@ class IbisQueryBuilder:
             )
         if table_args.type == "query":
             q = frappe.get_doc("Insights Query v3", table_args.query_name)
-            _table = q.build(use_live_connection=self.use_live_connection)
+            if not self.use_live_connection:
+                _table = q.get_materialized_results()
+            if _table is None:
+                _table = q.build(use_live_connection=self.use_live_connection)
 
         if _table is None:
             frappe.throw("Table or Query not found")
@@ -475,6 +500,8 @@ class IbisQueryBuilder:
         ds = frappe.get_doc("Insights Data Source v3", data_source)
         db = ds._get_ibis_backend()
 
+        import sqlparse
+
         raw_sql = sqlparse.format(sql=raw_sql, strip_comments=True)
 
         check_permissions = frappe.db.get_single_value(
@@ -663,7 +690,13 @@ class IbisQueryBuilder:
 
     def get_current_columns(self):
         # TODO: handle collisions with function names
-        return {col: getattr(self.query, col) for col in self.query.schema().names}
+        # the columns are only looked up again after an operation changes the query,
+        # so that the expressions of the same operation (e.g. measures of a summary) share them
+        query, columns = self._column_namespace
+        if query is not self.query:
+            columns = {col: getattr(self.query, col) for col in self.query.schema().names}
+            self._column_namespace = (self.query, columns)
+        return columns
 
 
 def execute_ibis_query(
@@ -682,43 +715,179 @@ def execute_ibis_query(
         raise
 
     if cache:
-        backends, _ = query._find_backends()
-        backend_id = backends[0].db_identity if backends else None
-        cache_key = make_digest(sql, backend_id)
+        cache_key = get_cache_key(query, sql)
+        if not force and (cached_results := get_cached_results(cache_key)) is not None:
+            return cached_results, -1
 
-        if has_cached_results(cache_key) and not force:
-            return get_cached_results(cache_key), -1
+    query = limit_query(query, limit)
+
+    # concurrent requests for the same query wait for the first one to cache the results
+    with coalesce_execution(cache_key) if cache else nullcontext(False) as waited:
+        if waited and (cached_results := get_cached_results(cache_key)) is not None:
+            return cached_results, -1
+
+        start = time.monotonic()
+
+        try:
+            result = query.execute()
+        except Exception as e:
+            if "max_statement_time" in str(e):
+                frappe.log_error(
+                    title="Query execution time exceeded the limit.",
+                    message=f"Query: {sql}",
+                )
+                frappe.throw(
+                    title="Query Timeout",
+                    msg="Query execution time exceeded the limit. Please try again with a smaller timespan or a more specific filter.",
+                )
+            raise e
+
+        time_taken = flt(time.monotonic() - start, 3)
+        create_execution_log(sql, time_taken, reference_name)
+
+        if isinstance(result, pd.DataFrame):
+            result = result.replace({pd.NaT: None, np.nan: None})
+            if cache:
+                cache_results(cache_key, result, get_cache_expiry(query, cache_expiry))
+
+    return result, time_taken
 
+
+def limit_query(query: IbisQuery, limit=100) -> IbisQuery:
     if hasattr(query, "limit") and limit:
         limit = int(limit or 100)
         limit = min(max(limit, 1), 10_00_000)
         query = query.limit(limit)
+    return query
+
+
+def get_cache_key(query: IbisQuery, sql: str | None = None) -> str:
+    backends, _ = query._find_backends()
+    backend_id = backends[0].db_identity if backends else None
+    # results of the tables imported to the warehouse change only when they are imported again
+    table_versions = get_table_versions(get_query_tables(query) or [])
+    return make_digest(sql or ibis.to_sql(query), backend_id, table_versions)
+
+
+def get_cache_expiry(query: IbisQuery, cache_expiry: int | None) -> int | None:
+    # results of queries that only read from imported warehouse tables are cached till one of the tables
+    # is imported again (the key of the results changes with the versions of the tables), or for a day
+    backends, _ = query._find_backends()
+    if len(backends) != 1 or get_backend_name(backends[0]) != WAREHOUSE_DB_NAME:
+        return cache_expiry
+    if query.op().find(InMemoryTable):
+        return cache_expiry
+
+    tables = get_query_tables(query)
+    if not tables or any(version is None for _, version in get_table_versions(tables)):
+        # temporary tables & tables imported before versions were tracked
+        return cache_expiry
+    return VERSIONED_CACHE_EXPIRY
+
+
+def get_query_tables(query: IbisQuery) -> set[str] | None:
+    # returns the names of the tables a query reads from, or None if they can't be determined
+    op = query.op()
+    tables = {table.name for table in op.find_topmost(DatabaseTable)}
+    # queries rebuilt from sql (cached builds & native queries) don't have table nodes
+    for sql_op in op.find((SQLQueryResult, SQLStringView)):
+        try:
+            parsed = sg.parse_one(sql_op.query, read="duckdb")
+        except sg.errors.ParseError:
+            return None
+        ctes = {cte.alias for cte in parsed.find_all(sg.exp.CTE)}
+        tables.update(table.name for table in parsed.find_all(sg.exp.Table) if table.name not in ctes)
+    return tables
+
+
+# operations whose results depend on data fetched while building the query
+UNCACHEABLE_OPERATIONS = ("code", "pivot_wider")
+BUILD_CACHE_KEY_PREFIX = "insights:query_build:"
+BUILD_CACHE_EXPIRY = 60 * 5
+
+
+def has_uncacheable_operations(operations) -> bool:
+    operations = frappe.parse_json(operations) or []
+    return any(op.get("type") in UNCACHEABLE_OPERATIONS for op in operations)
+
+
+def cache_build(cache_key, query: IbisQuery, permission_versions: dict | None = None) -> IbisQuery:
+    """
+    Caches the compiled sql & schema of a built query, so that it can be recreated
+    with `backend.sql` without running the query builder again.
+    Only queries that read from tables which outlive the current connection are cached.
+
+    `permission_versions` are the versions of the doctypes whose allowed documents are applied
+    in the query, the cached build is discarded when the permissions of one of them change.
+
+    Returns the query recreated from the build, so that it compiles to the same sql (and has the same
+    result cache keys) as when it is recreated from the cached build by the following requests.
+    """
+    backend_name = get_portable_backend_name(query)
+    if not backend_name:
+        return query
+
+    build = {
+        "sql": ibis.to_sql(query),
+        "schema": query.schema(),
+        "backend": backend_name,
+        "permission_versions": permission_versions or {},
+    }
+    frappe.cache().set_value(BUILD_CACHE_KEY_PREFIX + cache_key, build, expires_in_sec=BUILD_CACHE_EXPIRY)
+    return get_query_from_build(build)
+
+
+def get_cached_build(cache_key) -> IbisQuery | None:
+    build = frappe.cache().get_value(BUILD_CACHE_KEY_PREFIX + cache_key)
+    if not build:
+        return None
 
-    start = time.monotonic()
+    permission_versions = build.get("permission_versions") or {}
+    if permission_versions and get_permission_versions(permission_versions) != permission_versions:
+        return None
+    for doctype, version in permission_versions.items():
+        track_permission_version(doctype, version)
 
-    try:
-        result = query.execute()
-    except Exception as e:
-        if "max_statement_time" in str(e):
-            frappe.log_error(
-                title="Query execution time exceeded the limit.",
-                message=f"Query: {sql}",
-            )
-            frappe.throw(
-                title="Query Timeout",
-                msg="Query execution time exceeded the limit. Please try again with a smaller timespan or a more specific filter.",
-            )
-        raise e
+    return get_query_from_build(build)
 
-    time_taken = flt(time.monotonic() - start, 3)
-    create_execution_log(sql, time_taken, reference_name)
 
-    if isinstance(result, pd.DataFrame):
-        result = result.replace({pd.NaT: None, np.nan: None})
-        if cache:
-            cache_results(cache_key, result, cache_expiry)
+def get_query_from_build(build: dict) -> IbisQuery:
+    backend = get_backend(build["backend"])
+    return backend.sql(build["sql"], schema=build["schema"])
+
+
+def get_portable_backend_name(query: IbisQuery) -> str | None:
+    # returns the backend of a query if its compiled sql can be run on any connection to that backend,
+    # i.e. it doesn't read from in-memory tables or tables registered on the current connection
+    backends, _ = query._find_backends()
+    if len(backends) != 1 or query.op().find(InMemoryTable):
+        return
+
+    backend_name = get_backend_name(backends[0])
+    if not backend_name:
+        return
+
+    if backend_name == WAREHOUSE_DB_NAME:
+        # temporary tables & views are dropped when the connection is closed
+        views = Warehouse().get_views()
+        if any(table.name not in views for table in query.op().find(DatabaseTable)):
+            return
+
+    return backend_name
 
-    return result, time_taken
+
+def get_backend_name(backend) -> str | None:
+    for name, db in getattr(frappe.local, "insights_db_connections", {}).items():
+        if db is backend:
+            return name
+
+
+def get_backend(name):
+    if db := getattr(frappe.local, "insights_db_connections", {}).get(name):
+        return db
+    if name == WAREHOUSE_DB_NAME:
+        return Warehouse().db
+    return InsightsDataSourcev3.get_doc(name)._get_ibis_backend()
 
 
 def get_columns_from_schema(schema: ibis.Schema):
@@ -753,33 +922,26 @@ def to_insights_type(dtype: DataType):
     return "String"
 
 
-def cache_results(cache_key, result: pd.DataFrame, cache_expiry=3600):
-    cache_key = "insights:query_results:" + cache_key
-    data = result.to_dict(orient="records")
-    data = frappe.as_json(data)
-    frappe.cache().set_value(cache_key, data, expires_in_sec=cache_expiry)
-
-
-def get_cached_results(cache_key) -> pd.DataFrame:
-    cache_key = "insights:query_results:" + cache_key
-    data = frappe.cache().get_value(cache_key)
-    if not data:
-        return None
-    data = frappe.parse_json(data)
-    df = pd.DataFrame(data).replace({pd.NaT: None, np.nan: None})
-    return df
-
-
-def has_cached_results(cache_key):
-    cache_key = "insights:query_results:" + cache_key
-    return frappe.cache().get_value(cache_key) is not None
-
-
 def exec_with_return(
     script: str,
     _globals: dict | None = None,
     _locals: dict | None = None,
 ):
+    _script, output_expression = parse_script(script)
+
+    _globals = _globals or {}
+    _locals = _locals or {}
+
+    if _script.strip():
+        safe_exec(_script, _globals, _locals, restrict_commit_rollback=True)
+        return safe_eval(output_expression, _globals, _locals)
+    else:
+        return safe_eval(output_expression, _globals, _locals)
+
+
+@lru_cache(maxsize=1024)
+def parse_script(script: str) -> tuple[str, str]:
+    # splits the script into the statements to execute and the expression to return
     tree = ast.parse(script)
 
     if not tree.body:
@@ -795,16 +957,8 @@ def exec_with_return(
     elif isinstance(last_node, ast.AnnAssign | ast.AugAssign):
         output_expression = ast.unparse(last_node.target)
 
-    _globals = _globals or {}
-    _locals = _locals or {}
-
     tree.body.pop()  # remove the last expression
-    _script = ast.unparse(tree)
-    if _script.strip():
-        safe_exec(_script, _globals, _locals, restrict_commit_rollback=True)
-        return safe_eval(output_expression, _globals, _locals)
-    else:
-        return safe_eval(output_expression, _globals, _locals)
+    return ast.unparse(tree), output_expression
 
 
 def get_ibis_table_name(table: IbisQuery):
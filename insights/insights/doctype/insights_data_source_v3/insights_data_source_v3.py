@@ -16,6 +16,7 @@ from insights.insights.doctype.insights_table_v3.insights_table_v3 import (
     InsightsTablev3,
 )
 
+from .connection_pool import POOLED_DATABASE_TYPES, connection_pool
 from .connectors.bigquery import get_bigquery_connection
 from .connectors.clickhouse import get_clickhouse_connection
 from .connectors.duckdb import get_duckdb_connection
@@ -65,6 +66,8 @@ class InsightsDataSourceDocument:
             return
 
         credentials_changed = self.has_credentials_changed()
+        if credentials_changed:
+            self.close_connections()
         if not self.is_site_db and credentials_changed and self.database_type in ["MariaDB", "PostgreSQL"]:
             self.db_set("is_frappe_db", is_frappe_db(self))
 
@@ -74,6 +77,13 @@ class InsightsDataSourceDocument:
         if self.status == "Active" and credentials_changed:
             self.update_table_list()
 
+    def close_connections(self):
+        # connections pooled by other workers are discarded on checkout since `modified` has changed
+        if db := getattr(frappe.local, "insights_db_connections", {}).pop(self.name, None):
+            getattr(frappe.local, "insights_pooled_connections", {}).pop(self.name, None)
+            db.disconnect()
+        connection_pool.invalidate((frappe.local.site, self.name))
+
     def has_credentials_changed(self):
         doc_before = self.get_doc_before_save()
         if not doc_before:
@@ -182,6 +192,27 @@ class InsightsDataSourcev3(InsightsDataSourceDocument, Document):
         if self.name in frappe.local.insights_db_connections:
             return frappe.local.insights_db_connections[self.name]
 
+        if not self.is_pooled():
+            db = self._connect()
+            frappe.local.insights_db_connections[self.name] = db
+            return db
+
+        pool_key = (frappe.local.site, self.name)
+        # connections made before the data source was last modified are discarded
+        pool_version = str(self.modified)
+        db = connection_pool.checkout(pool_key, pool_version) or self._connect()
+        frappe.local.insights_db_connections[self.name] = db
+        frappe.local.insights_pooled_connections[self.name] = (pool_key, pool_version)
+        return db
+
+    def is_pooled(self):
+        return bool(self.modified) and (
+            self.is_site_db or self.is_frappe_db or self.database_type in POOLED_DATABASE_TYPES
+        )
+
+    def _connect(self) -> BaseBackend:
+        # returns a new connection that is not tracked in `frappe.local`,
+        # the caller is responsible for disconnecting it
         try:
             db: BaseBackend = self._get_db_connection()
         except Exception as e:
@@ -205,7 +236,6 @@ class InsightsDataSourcev3(InsightsDataSourceDocument, Document):
             except Exception:
                 pass
 
-        frappe.local.insights_db_connections[self.name] = db
         return db
 
     def _get_db_connection(self) -> BaseBackend:
@@ -327,13 +357,19 @@ class InsightsDataSourcev3(InsightsDataSourceDocument, Document):
 def before_request():
     if not hasattr(frappe.local, "insights_db_connections"):
         frappe.local.insights_db_connections = {}
+    if not hasattr(frappe.local, "insights_pooled_connections"):
+        frappe.local.insights_pooled_connections = {}
 
 
 def after_request():
     closed = {}
+    pooled = getattr(frappe.local, "insights_pooled_connections", {})
     for name, db in getattr(frappe.local, "insights_db_connections", {}).items():
         try:
-            db.disconnect()
+            if name in pooled:
+                connection_pool.checkin(*pooled.pop(name), db)
+            else:
+                db.disconnect()
             closed[name] = True
         except Exception:
             frappe.log_error(title=f"Failed to disconnect db connection for {name}")
@@ -0,0 +1,218 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import os
+import pickle
+from contextlib import contextmanager
+
+import frappe
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from frappe.utils import get_files_path
+from redis.exceptions import LockError
+
+CACHE_KEY_PREFIX = "insights:query_results:"
+RESPONSE_CACHE_KEY_PREFIX = "insights:query_response:"
+# row counts are kept next to the results, so that they can be read without loading the results
+ROW_COUNT_KEY_PREFIX = "insights:query_row_count:"
+CACHE_FOLDER_NAME = "insights_result_cache"
+# results larger than this are written to the disk cache instead of redis
+MAX_REDIS_RESULT_SIZE = 1024 * 1024
+MAX_DISK_CACHE_SIZE = 1024 * 1024 * 1024
+LOCK_KEY_PREFIX = "insights:query_lock:"
+# hash of table name -> version, a version changes every time the table is imported
+TABLE_VERSIONS_KEY = "insights:table_versions"
+# results keyed by table versions can't be reached after an import, they are still
+# given an expiry so that the results of the previous versions don't pile up in redis
+VERSIONED_CACHE_EXPIRY = 60 * 60 * 24
+
+
+def cache_results(cache_key, result: pd.DataFrame, cache_expiry=3600):
+    try:
+        data = to_arrow_ipc(result)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # columns with mixed python types can't be converted to arrow
+        data = frappe.as_json(result.to_dict(orient="records"))
+
+    if isinstance(data, bytes) and len(data) > MAX_REDIS_RESULT_SIZE:
+        data = {"path": write_to_disk_cache(f"{cache_key}.arrow", data)}
+
+    frappe.cache().set_value(CACHE_KEY_PREFIX + cache_key, data, expires_in_sec=cache_expiry)
+    frappe.cache().set_value(ROW_COUNT_KEY_PREFIX + cache_key, len(result), expires_in_sec=cache_expiry)
+
+
+def get_cached_row_count(cache_key) -> int | None:
+    return frappe.cache().get_value(ROW_COUNT_KEY_PREFIX + cache_key)
+
+
+def get_cached_results(cache_key) -> pd.DataFrame:
+    cache_key = CACHE_KEY_PREFIX + cache_key
+    data = frappe.cache().get_value(cache_key)
+    if not data:
+        return None
+
+    if isinstance(data, dict):
+        data = read_from_disk_cache(data.get("path"))
+        if data is None:
+            return None
+
+    if isinstance(data, bytes):
+        df = from_arrow_ipc(data)
+    else:
+        df = pd.DataFrame(frappe.parse_json(data))
+
+    return df.replace({pd.NaT: None, np.nan: None})
+
+
+def has_cached_results(cache_key):
+    cache_key = CACHE_KEY_PREFIX + cache_key
+    return bool(frappe.cache().exists(cache_key))
+
+
+def cache_response(cache_key, response: dict, cache_expiry=3600):
+    # the response is cached as it is returned to the client,
+    # so that a cache hit doesn't need to go through pandas
+    data = pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) > MAX_REDIS_RESULT_SIZE:
+        data = {"path": write_to_disk_cache(f"{cache_key}.pickle", data)}
+
+    frappe.cache().set_value(RESPONSE_CACHE_KEY_PREFIX + cache_key, data, expires_in_sec=cache_expiry)
+
+
+def get_cached_response(cache_key) -> dict | None:
+    data = frappe.cache().get_value(RESPONSE_CACHE_KEY_PREFIX + cache_key)
+    if not data:
+        return None
+
+    if isinstance(data, dict):
+        data = read_from_disk_cache(data.get("path"))
+        if data is None:
+            return None
+
+    return pickle.loads(data)
+
+
+@contextmanager
+def coalesce_execution(cache_key):
+    """
+    Lets only one worker execute a query at a time for a cache key.
+
+    Yields True if another worker was executing the same query when this one arrived,
+    in which case the caller should read the results it cached before executing again.
+    If the other worker takes longer than the query timeout, the caller executes anyway.
+    """
+    timeout = frappe.db.get_single_value("Insights Settings", "max_execution_time", cache=True) or 180
+    lock = frappe.cache().lock(
+        frappe.cache().make_key(LOCK_KEY_PREFIX + cache_key),
+        timeout=timeout + 10,
+    )
+
+    waited = False
+    acquired = lock.acquire(blocking=False)
+    if not acquired:
+        waited = True
+        acquired = lock.acquire(blocking=True, blocking_timeout=timeout)
+
+    try:
+        yield waited
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockError:
+                # lock expired while the query was running
+                pass
+
+
+def get_table_versions(tables) -> list[tuple[str, str | None]]:
+    tables = sorted(tables)
+    versions = get_hash_values(TABLE_VERSIONS_KEY, tables)
+    return list(zip(tables, versions, strict=True))
+
+
+def get_hash_values(name: str, keys: list[str]) -> list:
+    # values of a hash set with `frappe.cache().hset`, fetched in a single round trip
+    if not keys:
+        return []
+    values = frappe.cache().hmget(frappe.cache().make_key(name), keys)
+    # `hset` pickles the values
+    return [pickle.loads(value) if value else None for value in values]
+
+
+def bump_table_version(table: str):
+    # invalidates the cached results of the queries that read from the table
+    frappe.cache().hset(TABLE_VERSIONS_KEY, table, frappe.generate_hash(length=10))
+
+
+def to_arrow_ipc(result: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(result, preserve_index=False)
+    compression = "zstd" if pa.Codec.is_available("zstd") else None
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_arrow_ipc(data: bytes) -> pd.DataFrame:
+    with pa.ipc.open_stream(data) as reader:
+        return reader.read_all().to_pandas()
+
+
+def get_disk_cache_folder() -> str:
+    path = os.path.realpath(get_files_path(is_private=1))
+    path = os.path.join(path, CACHE_FOLDER_NAME)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+
+def write_to_disk_cache(filename: str, data: bytes) -> str:
+    folder = get_disk_cache_folder()
+    path = os.path.join(folder, filename)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    evict_disk_cache(folder)
+    return path
+
+
+def read_from_disk_cache(path: str | None) -> bytes | None:
+    # the file may have been evicted or written on another server
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        # mark as recently used
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+def evict_disk_cache(folder: str, max_size=MAX_DISK_CACHE_SIZE):
+    # remove the least recently used files until the cache fits in `max_size`
+    files = []
+    total_size = 0
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+    if total_size <= max_size:
+        return
+
+    for _, size, path in sorted(files):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_size -= size
+        if total_size <= max_size:
+            break
@@ -9,7 +9,7 @@ from functools import cached_property
 import frappe
 from frappe import _dict
 from frappe.model.document import Document
-from frappe.utils import flt
+from frappe.utils import cint, flt
 
 from insights.decorators import log_error
 from insights.insights.doctype.insights_data_source.sources.utils import (
@@ -23,6 +23,7 @@ from insights.utils import (
 )
 
 from ..insights_data_source.sources.query_store import store_query
+from ..insights_query_result.insights_query_result import slice_results
 from ..insights_table_column.insights_table_column import InsightsTableColumn
 from .insights_assisted_query import InsightsAssistedQueryController
 from .insights_legacy_query import (
@@ -173,15 +174,18 @@ class InsightsQuery(InsightsLegacyQueryClient, InsightsQueryClient, Document):
     def delete_query_results(self):
         InsightsQueryResult.delete_doc(self.result_name)
 
-    def retrieve_results(self, fetch_if_not_cached=False):
-        if hasattr(self, "_results"):
-            return self._results
-        if not InsightsQueryResult.exists(query=self.name):
-            if fetch_if_not_cached:
-                return self.fetch_results()
-            return []
-        query_result = InsightsQueryResult.get_doc(query=self.name)
-        return frappe.parse_json(query_result.results)
+    def retrieve_results(self, fetch_if_not_cached=False, columns=None, start=0, page_length=None):
+        if not hasattr(self, "_results"):
+            if InsightsQueryResult.exists(query=self.name):
+                query_result = InsightsQueryResult.get_doc(query=self.name)
+                return query_result.get_results(columns, start, page_length)
+            if not fetch_if_not_cached:
+                return []
+            self.fetch_results()
+
+        # the results fetched by this document are sliced like the stored results
+        page_length = cint(page_length) if page_length is not None else None
+        return slice_results(self._results, columns, cint(start), page_length)
 
     def fetch_results(self, additional_filters=None):
         self.before_fetch()
@@ -218,12 +222,7 @@ class InsightsQuery(InsightsLegacyQueryClient, InsightsQueryClient, Document):
     def update_query_results(self, results=None):
         results = results or []
         query_result: Document = InsightsQueryResult.get_or_create_doc(query=self.name)
-        query_result.update(
-            {
-                "results": frappe.as_json(results),
-                "results_row_count": len(results) - 1,
-            }
-        )
+        query_result.set_results(results)
         with suppress(frappe.exceptions.UniqueValidationError):
             query_result.db_update()
 
@@ -5,12 +5,16 @@ from dataclasses import dataclass
 from enum import Enum
 
 import frappe
+import numpy as np
 import pandas as pd
 import sqlparse
 from frappe import _dict
 
 from insights.utils import InsightsDataSource, ResultColumn
 
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
 
 class QueryStatus(Enum):
     PENDING = "Pending Execution"
@@ -185,7 +189,7 @@ def infer_type(value):
 
 
 def infer_type_from_list(values):
-    inferred_types = [infer_type(v) for v in values]
+    inferred_types = infer_types(values)
     if "String" in inferred_types:
         return "String"
     elif "Decimal" in inferred_types:
@@ -198,6 +202,73 @@ def infer_type_from_list(values):
         return "String"
 
 
+def infer_types(values) -> set[str]:
+    """
+    Returns the set of types `infer_type` returns for the values.
+
+    Numbers and numeric strings are checked for all the values at once,
+    the rest are checked with `infer_type` once per distinct value,
+    stopping at the first string since it makes the whole column a string.
+    """
+    inferred_types = set()
+    floats, strings, others = [], [], []
+    for value in values:
+        if isinstance(value, bool | np.bool_):
+            others.append(value)
+        elif isinstance(value, int | np.integer) and INT64_MIN <= value <= INT64_MAX:
+            inferred_types.add("Integer")
+        elif isinstance(value, float | np.floating):
+            floats.append(value)
+        elif isinstance(value, str):
+            strings.append(value)
+        else:
+            others.append(value)
+
+    if floats:
+        inferred_types.update(get_numeric_types(np.array(floats, dtype=float)))
+
+    if strings:
+        numbers = pd.to_numeric(pd.Series(strings, dtype=object), errors="coerce")
+        if numbers.dtype == object:
+            # numbers that don't fit in a single numeric type are left as they are
+            others.extend(strings)
+        else:
+            is_number = numbers.notna()
+            inferred_types.update(get_numeric_types(numbers[is_number].to_numpy(dtype=float)))
+            # strings that are not numbers, or are parsed as NaN like "nan"
+            others.extend(value for value, number in zip(strings, is_number, strict=True) if not number)
+
+    checked = set()
+    for value in others:
+        if "String" in inferred_types:
+            break
+        try:
+            key = (type(value), value)
+            if key in checked:
+                continue
+            checked.add(key)
+        except TypeError:
+            # unhashable values are checked every time
+            pass
+        inferred_types.add(infer_type(value))
+
+    return inferred_types
+
+
+def get_numeric_types(numbers: np.ndarray) -> set[str]:
+    # same as `val % 1 == 0` in `infer_type`, nan & inf are decimals
+    if not len(numbers):
+        return set()
+    with np.errstate(invalid="ignore"):
+        is_integer = np.mod(numbers, 1) == 0
+    types = set()
+    if is_integer.any():
+        types.add("Integer")
+    if not is_integer.all():
+        types.add("Decimal")
+    return types
+
+
 def get_columns_with_inferred_types(results):
     columns = ResultColumn.from_dicts(results[0])
     column_names = [column.label for column in columns]
@@ -205,7 +276,7 @@ def get_columns_with_inferred_types(results):
     column_types = (
         infer_type_from_list(results_df[column_name]) for column_name in column_names
     )
-    for column, column_type in zip(columns, column_types):
+    for column, column_type in zip(columns, column_types, strict=True):
         column.type = column_type
     return columns
 
@@ -1,9 +1,144 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
-# import frappe
+import json
+import os
+
+import frappe
+import pyarrow as pa
+import pyarrow.parquet as pq
 from frappe.model.document import Document
+from frappe.utils import cint, get_files_path
+
+RESULTS_FOLDER_NAME = "insights_query_results"
+ROW_GROUP_SIZE = 10_000
+# schema metadata keys
+COLUMNS_KEY = b"insights_columns"
+JSON_COLUMNS_KEY = b"insights_json_columns"
 
 
 class InsightsQueryResult(Document):
-    pass
+    def on_trash(self):
+        self.remove_results_file()
+
+    @property
+    def results_path(self):
+        if self.results_file:
+            return os.path.join(get_results_folder(), self.results_file)
+
+    def set_results(self, results: list):
+        """
+        Writes the results to a parquet file, the first row of `results` is the list of columns.
+
+        Only the file name is stored in the document, the rows are read back with `get_results`.
+        """
+        results = results or []
+        self.results = None
+        self.results_row_count = len(results) - 1
+        if len(results) < 2:
+            self.remove_results_file()
+            self.results_file = None
+            self.results = frappe.as_json(results)
+            return
+
+        self.results_file = f"{frappe.scrub(self.query)}.parquet"
+        path = self.results_path
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(to_arrow_table(results), tmp_path, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp_path, path)
+
+    def get_results(self, columns=None, start=0, page_length=None) -> list:
+        """
+        Returns the columns and rows of the results, the first row is the list of columns.
+
+        Only the row groups of the file that contain the requested rows, and only the requested columns
+        (by label) are read. Results stored before they were written to files are read from `results`.
+        """
+        start = cint(start)
+        page_length = cint(page_length) if page_length is not None else None
+
+        path = self.results_path
+        if not path or not os.path.exists(path):
+            return slice_results(frappe.parse_json(self.results) or [], columns, start, page_length)
+
+        parquet_file = pq.ParquetFile(path)
+        metadata = parquet_file.schema_arrow.metadata
+        result_columns = json.loads(metadata[COLUMNS_KEY])
+        json_columns = set(json.loads(metadata.get(JSON_COLUMNS_KEY, b"[]")))
+
+        indexes = get_column_indexes(result_columns, columns)
+        row_groups = []
+        skipped_rows = 0
+        end = start + page_length if page_length is not None else None
+        group_start = 0
+        for idx in range(parquet_file.num_row_groups):
+            num_rows = parquet_file.metadata.row_group(idx).num_rows
+            group_end = group_start + num_rows
+            if group_end > start and (end is None or group_start < end):
+                row_groups.append(idx)
+            elif group_end <= start:
+                skipped_rows += num_rows
+            group_start = group_end
+
+        table = parquet_file.read_row_groups(row_groups, columns=[f"c{idx}" for idx in indexes])
+        table = table.slice(start - skipped_rows, page_length)
+
+        values = [
+            [json.loads(v) for v in table.column(f"c{idx}").to_pylist()]
+            if idx in json_columns
+            else table.column(f"c{idx}").to_pylist()
+            for idx in indexes
+        ]
+        rows = [list(row) for row in zip(*values, strict=True)]
+        return [[result_columns[idx] for idx in indexes], *rows]
+
+    @frappe.whitelist()
+    def fetch_results(self, columns=None, start=0, page_length=None):
+        return self.get_results(frappe.parse_json(columns), start, page_length)
+
+    def remove_results_file(self):
+        path = self.results_path
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def get_results_folder() -> str:
+    path = os.path.realpath(get_files_path(RESULTS_FOLDER_NAME, is_private=1))
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+
+def to_arrow_table(results: list) -> pa.Table:
+    # columns are stored by position since labels are not always unique
+    result_columns, rows = results[0], results[1:]
+    arrays = []
+    json_columns = []
+    for idx, values in enumerate(zip(*rows, strict=False)):
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, OverflowError):
+            # columns with mixed python types are stored as json
+            arrays.append(pa.array([frappe.as_json(v, indent=None) for v in values], pa.string()))
+            json_columns.append(idx)
+
+    metadata = {
+        COLUMNS_KEY: frappe.as_json(result_columns, indent=None),
+        JSON_COLUMNS_KEY: frappe.as_json(json_columns, indent=None),
+    }
+    return pa.table(arrays, names=[f"c{idx}" for idx in range(len(arrays))], metadata=metadata)
+
+
+def get_column_indexes(result_columns: list, columns: list | None = None) -> list[int]:
+    if not columns:
+        return list(range(len(result_columns)))
+    labels = [c.get("label") if isinstance(c, dict) else c for c in result_columns]
+    return [idx for idx, label in enumerate(labels) if label in columns]
+
+
+def slice_results(results: list, columns=None, start=0, page_length=None) -> list:
+    if not results:
+        return results
+    indexes = get_column_indexes(results[0], columns)
+    end = start + page_length if page_length is not None else None
+    return [[row[idx] for idx in indexes] for row in [results[0], *results[1:][start:end]]]
@@ -1,9 +1,75 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from insights.insights.doctype.insights_query_result import insights_query_result
+from insights.utils import ResultColumn
+
 
 class TestInsightsQueryResult(FrappeTestCase):
-    pass
+    def get_results(self, rows=25):
+        columns = [
+            ResultColumn.from_args("ID", "Integer"),
+            ResultColumn.from_args("Name", "String"),
+            ResultColumn.from_args("Created", "Datetime"),
+            ResultColumn.from_args("Mixed", "String"),
+        ]
+        rows = [
+            [idx, f"Row {idx}", datetime(2024, 1, 1, idx % 24), idx if idx % 2 else str(idx)]
+            for idx in range(rows)
+        ]
+        return [columns, *rows]
+
+    def get_result_doc(self):
+        doc = frappe.new_doc("Insights Query Result")
+        doc.query = "Test Query Result"
+        self.addCleanup(doc.remove_results_file)
+        return doc
+
+    def test_results_are_stored_in_a_file(self):
+        doc = self.get_result_doc()
+        results = self.get_results()
+        doc.set_results(results)
+
+        self.assertFalse(doc.results)
+        self.assertTrue(os.path.exists(doc.results_path))
+        self.assertEqual(doc.results_row_count, 25)
+        self.assertEqual(doc.get_results(), results)
+
+    def test_column_projection_and_pagination(self):
+        doc = self.get_result_doc()
+        results = self.get_results()
+        with patch.object(insights_query_result, "ROW_GROUP_SIZE", 10):
+            doc.set_results(results)
+
+        page = doc.get_results(columns=["Name", "Mixed"], start=8, page_length=5)
+        self.assertEqual([c["label"] for c in page[0]], ["Name", "Mixed"])
+        self.assertEqual(page[1:], [[row[1], row[3]] for row in results[9:14]])
+        self.assertEqual(doc.get_results(start=20), [results[0], *results[21:]])
+        self.assertEqual(doc.get_results(page_length=0), [results[0]])
+
+    def test_legacy_results(self):
+        doc = self.get_result_doc()
+        results = frappe.parse_json(frappe.as_json(self.get_results()))
+        doc.results = frappe.as_json(results)
+
+        self.assertEqual(doc.get_results(), results)
+        self.assertEqual(doc.get_results(columns=["ID"], start=1, page_length=2), [[results[0][0]], [1], [2]])
+
+    def test_fetched_results_are_paged(self):
+        from insights.insights.doctype.insights_query.insights_query import InsightsQuery
+
+        # results fetched by the query document are memoized, every call still gets its own page
+        results = frappe.parse_json(frappe.as_json(self.get_results()))
+        query = frappe._dict(_results=results)
+
+        first_page = InsightsQuery.retrieve_results(query, start=0, page_length=5)
+        second_page = InsightsQuery.retrieve_results(query, columns=["ID"], start=5, page_length=5)
+        self.assertEqual(first_page, [results[0], *results[1:6]])
+        self.assertEqual(second_page, [[results[0][0]], *[[row[0]] for row in results[6:11]]])
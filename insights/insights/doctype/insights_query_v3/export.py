@@ -0,0 +1,298 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import os
+import time
+from datetime import datetime
+
+import frappe
+import ibis
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from frappe.utils import flt, get_files_path
+from frappe.utils.data import add_days, now_datetime
+from ibis.expr.operations.relations import InMemoryTable
+
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+    STREAMING_BACKENDS,
+    WAREHOUSE_DB_NAME,
+)
+from insights.insights.doctype.insights_data_source_v3.ibis_utils import (
+    get_backend_name,
+)
+from insights.insights.doctype.insights_data_source_v3.insights_data_source_v3 import (
+    db_connections,
+)
+from insights.utils import create_execution_log
+
+EXPORT_EVENT = "insights_export_progress"
+# the last status of an export is also cached, for clients that missed its event
+EXPORT_STATUS_KEY_PREFIX = "insights:export_status:"
+EXPORT_STATUS_EXPIRY = 60 * 60
+EXPORT_FILE_PREFIX = "insights_export_"
+FILE_EXTENSIONS = {
+    "csv": "csv",
+    "excel": "xlsx",
+    "parquet": "parquet",
+    "arrow": "arrow",
+}
+# formats that the warehouse writes itself with COPY
+COPY_OPTIONS = {
+    "csv": "FORMAT CSV, HEADER",
+    "parquet": "FORMAT PARQUET, COMPRESSION ZSTD",
+}
+EXPORT_BATCH_SIZE = 50_000
+# backends that are not in `STREAMING_BACKENDS` fetch the whole result into memory before the
+# first batch is written, so their exports are limited to the rows that downloads were limited to
+MAX_EXPORT_ROWS = 10_00_000
+# rows in an excel sheet, including the header row
+MAX_EXCEL_ROWS = 1_048_576
+# seconds between progress events
+PROGRESS_INTERVAL = 2
+EXPORT_FILE_EXPIRY_DAYS = 1
+
+
+def enqueue_export(doc, format="csv", active_operation_idx=None, adhoc_filters=None) -> str:
+    """
+    Queues an export of the results of the query to a private file, and returns the id of the export.
+
+    The progress of the export is published to the user with the `insights_export_progress` event,
+    the last event has the url of the exported file. The last status is also returned by
+    `get_export_status`.
+    """
+    if format not in FILE_EXTENSIONS:
+        frappe.throw(f"Export format {format} is not supported")
+
+    export_id = frappe.generate_hash(length=12)
+    frappe.enqueue(
+        method="insights.insights.doctype.insights_query_v3.export.export_query",
+        queue="long",
+        timeout=60 * 60,
+        export_id=export_id,
+        # the query is passed as it is, since it can have unsaved changes
+        query=doc.as_dict(),
+        format=format,
+        active_operation_idx=active_operation_idx,
+        adhoc_filters=adhoc_filters,
+    )
+    return export_id
+
+
+def export_query(export_id, query, format="csv", active_operation_idx=None, adhoc_filters=None):
+    from insights.insights.doctype.insights_query_v3.insights_query_v3 import (
+        set_adhoc_filters,
+    )
+
+    filename = f"{EXPORT_FILE_PREFIX}{export_id}.{FILE_EXTENSIONS[format]}"
+    path = os.path.join(get_files_path(is_private=1), filename)
+    tmp_path = f"{path}.tmp"
+    progress = ExportProgress(export_id)
+
+    try:
+        doc = frappe.get_doc(query)
+        with db_connections():
+            with set_adhoc_filters(adhoc_filters):
+                ibis_query = doc.build(active_operation_idx)
+
+            start = time.monotonic()
+            rows, truncated = write_export(ibis_query, tmp_path, format, progress.update)
+            create_execution_log(ibis.to_sql(ibis_query), flt(time.monotonic() - start, 3), doc.name)
+
+        os.replace(tmp_path, path)
+        file_url = create_export_file(filename, export_id)
+        frappe.db.commit()
+        progress.publish("Completed", rows, file_url=file_url, truncated=truncated, filename=filename)
+    except Exception as e:
+        frappe.db.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        frappe.log_error(title=f"Failed to export query {query.get('name')}")
+        progress.publish("Failed", error=str(e))
+
+
+def write_export(ibis_query, path: str, format: str, on_progress=None) -> tuple[int, bool]:
+    """
+    Writes the results of the query to `path`, and returns the number of rows written
+    and whether they were truncated to `MAX_EXPORT_ROWS`.
+    """
+    if format in COPY_OPTIONS and is_warehouse_query(ibis_query):
+        return copy_export(ibis_query, path, format), False
+
+    max_rows = None if is_streaming_query(ibis_query) else MAX_EXPORT_ROWS
+    if max_rows:
+        # one extra row tells if the results were truncated
+        ibis_query = ibis_query.limit(max_rows + 1)
+
+    # streaming backends hold one batch in memory at a time, the others hold the whole result
+    batches = ibis_query.to_pyarrow_batches(chunk_size=EXPORT_BATCH_SIZE)
+    rows = 0
+    truncated = False
+    with get_writer(format, path, batches.schema) as writer:
+        for batch in batches:
+            if max_rows and rows + batch.num_rows > max_rows:
+                batch = batch.slice(0, max_rows - rows)
+                truncated = True
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            if on_progress:
+                on_progress(rows)
+            if truncated:
+                break
+    return rows, truncated
+
+
+def is_streaming_query(ibis_query) -> bool:
+    backends, _ = ibis_query._find_backends()
+    return all(backend.name in STREAMING_BACKENDS for backend in backends)
+
+
+def is_warehouse_query(ibis_query) -> bool:
+    backends, _ = ibis_query._find_backends()
+    if len(backends) != 1 or get_backend_name(backends[0]) != WAREHOUSE_DB_NAME:
+        return False
+    # in-memory tables are only registered with the connection when the query is executed by ibis
+    return not ibis_query.op().find(InMemoryTable)
+
+
+def copy_export(ibis_query, path: str, format: str) -> int:
+    # the warehouse writes the file itself, so no row passes through python
+    backends, _ = ibis_query._find_backends()
+    sql = ibis.to_sql(ibis_query, dialect="duckdb")
+    path = path.replace("'", "''")
+    result = backends[0].raw_sql(f"COPY ({sql}) TO '{path}' ({COPY_OPTIONS[format]})").fetchone()
+    return result[0] if result else 0
+
+
+def get_writer(format: str, path: str, schema):
+    if format == "csv":
+        return pa_csv.CSVWriter(path, schema)
+    if format == "parquet":
+        return pq.ParquetWriter(path, schema)
+    if format == "arrow":
+        return pa.ipc.new_file(path, schema)
+    if format == "excel":
+        return ExcelWriter(path, schema)
+    frappe.throw(f"Export format {format} is not supported")
+
+
+class ExcelWriter:
+    def __init__(self, path: str, schema):
+        from openpyxl import Workbook
+
+        self.path = path
+        # a write only workbook flushes the rows to a temporary file as they are added
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(schema.names)
+        self.rows = 1
+
+    def write_batch(self, batch):
+        if self.rows + batch.num_rows > MAX_EXCEL_ROWS:
+            frappe.throw(
+                f"Excel files can't have more than {MAX_EXCEL_ROWS} rows, please export as CSV or Parquet"
+            )
+
+        columns = [column.to_pylist() for column in batch.columns]
+        for row in zip(*columns, strict=True):
+            self.sheet.append([to_excel_value(value) for value in row])
+        self.rows += batch.num_rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.workbook.save(self.path)
+        else:
+            self.workbook.close()
+
+
+def to_excel_value(value):
+    if isinstance(value, datetime) and value.tzinfo:
+        # excel doesn't support timezones
+        return value.replace(tzinfo=None)
+    if isinstance(value, dict | list):
+        return frappe.as_json(value, indent=None)
+    return value
+
+
+class ExportProgress:
+    def __init__(self, export_id):
+        self.export_id = export_id
+        self.last_published = 0
+
+    def update(self, rows: int):
+        if time.monotonic() - self.last_published < PROGRESS_INTERVAL:
+            return
+        self.publish("Running", rows)
+
+    def publish(self, status: str, rows: int = 0, file_url=None, error=None, truncated=False, filename=None):
+        self.last_published = time.monotonic()
+        message = {
+            "export_id": self.export_id,
+            "status": status,
+            "rows": rows,
+            "file_url": file_url,
+            "error": error,
+            "truncated": truncated,
+        }
+        frappe.cache().set_value(
+            EXPORT_STATUS_KEY_PREFIX + self.export_id,
+            {**message, "user": frappe.session.user, "filename": filename},
+            expires_in_sec=EXPORT_STATUS_EXPIRY,
+        )
+        frappe.publish_realtime(event=EXPORT_EVENT, user=frappe.session.user, message=message)
+
+
+def get_export_status(export_id: str) -> dict | None:
+    status = frappe.cache().get_value(EXPORT_STATUS_KEY_PREFIX + export_id)
+    if not status or status.pop("user") != frappe.session.user:
+        return None
+    return status
+
+
+def create_export_file(filename: str, export_id: str) -> str:
+    file = frappe.get_doc(
+        {
+            "doctype": "File",
+            "file_name": filename,
+            "file_url": f"/private/files/{filename}",
+            "is_private": 1,
+            # hashing the content would read the whole export into memory
+            "content_hash": frappe.generate_hash(length=32),
+        }
+    )
+    file.insert(ignore_permissions=True)
+
+    if frappe.session.user == "Guest":
+        # guests can't read private files, so the file is sent by `download_export`
+        return f"/api/method/insights.insights.doctype.insights_query_v3.export.download_export?export_id={export_id}"
+    return file.file_url
+
+
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+def download_export(export_id: str):
+    status = get_export_status(export_id)
+    if not status or status["status"] != "Completed":
+        raise frappe.PermissionError
+
+    filename = os.path.basename(status["filename"])
+    with open(os.path.join(get_files_path(is_private=1), filename), "rb") as f:
+        frappe.local.response.filecontent = f.read()
+    frappe.local.response.filename = filename
+    frappe.local.response.type = "download"
+
+
+def delete_old_exports():
+    files = frappe.get_all(
+        "File",
+        filters={
+            "file_name": ["like", f"{EXPORT_FILE_PREFIX}%"],
+            "is_private": 1,
+            "creation": ["<", add_days(now_datetime(), -EXPORT_FILE_EXPIRY_DAYS)],
+        },
+        pluck="name",
+    )
+    for file in files:
+        frappe.delete_doc("File", file, ignore_permissions=True)
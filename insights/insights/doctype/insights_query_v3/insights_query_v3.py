@@ -3,21 +3,57 @@
 
 import base64
 from contextlib import contextmanager
+from datetime import datetime
 from io import BytesIO
 
 import frappe
 import ibis
-import sqlparse
 from frappe.model.document import Document
+from frappe.utils import cint
+from frappe.utils.background_jobs import is_job_enqueued
+from frappe.utils.data import get_datetime, now_datetime
 from ibis import _
 from insights.decorators import insights_whitelist
+from insights.cache_utils import make_digest
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import Warehouse
 from insights.insights.doctype.insights_data_source_v3.ibis_utils import (
     IbisQueryBuilder,
+    cache_build,
     execute_ibis_query,
+    get_cache_expiry,
+    get_cache_key,
+    get_cached_build,
     get_columns_from_schema,
+    has_uncacheable_operations,
+    limit_query,
+)
+from insights.insights.doctype.insights_data_source_v3.insights_data_source_v3 import (
+    db_connections,
+)
+from insights.insights.doctype.insights_data_source_v3.result_cache import (
+    bump_table_version,
+    cache_response,
+    coalesce_execution,
+    get_cached_response,
+    get_cached_row_count,
+)
+from insights.insights.doctype.insights_query_v3.export import (
+    enqueue_export,
+    get_export_status,
+)
+from insights.insights.doctype.insights_table_v3.insights_table_v3 import (
+    get_permission_version,
+    track_permission_versions,
 )
 from insights.utils import deep_convert_dict_to_dict
 
+RESPONSE_CACHE_EXPIRY = 60 * 10
+# rows of a query that are kept in the result cache for paging, unless the query has a lower limit
+PAGED_RESULTS_LIMIT = 1_00_000
+MAX_PAGE_SIZE = 1000
+# versions of the linked queries by the queries they're linked from, cleared when any query is updated
+LINKED_QUERY_VERSIONS_CACHE_KEY = "insights:linked_query_versions"
+
 
 class InsightsQueryv3(Document):
     # begin: auto-generated types
@@ -34,6 +70,9 @@ class InsightsQueryv3(Document):
         is_native_query: DF.Check
         is_script_query: DF.Check
         linked_queries: DF.JSON | None
+        materialize: DF.Check
+        materialize_cron: DF.Data | None
+        materialized_on: DF.Datetime | None
         old_name: DF.Data | None
         operations: DF.JSON | None
         sort_order: DF.Int
@@ -56,16 +95,36 @@ class InsightsQueryv3(Document):
         return d
 
     def on_trash(self):
+        frappe.cache().delete_value(LINKED_QUERY_VERSIONS_CACHE_KEY)
         for alert in frappe.get_all("Insights Alert", filters={"query": self.name}, pluck="name"):
             frappe.delete_doc("Insights Alert", alert, force=True, ignore_permissions=True)
 
+        if self.materialized_on:
+            Warehouse().remove_query_results(self.name)
+
         # Clean up empty folders
         if self.folder:
             self.cleanup_empty_folder(self.folder)
 
+    def validate(self):
+        if not self.materialize_cron:
+            return
+
+        from croniter import croniter
+
+        if not croniter.is_valid(self.materialize_cron):
+            frappe.throw(f"{self.materialize_cron} is not a valid cron expression")
+
     def before_save(self):
         self.set_linked_queries()
 
+    def on_update(self):
+        frappe.cache().delete_value(LINKED_QUERY_VERSIONS_CACHE_KEY)
+        if self.materialize and (
+            self.has_value_changed("materialize") or self.has_value_changed("operations")
+        ):
+            self.enqueue_materialize_results()
+
     def cleanup_empty_folder(self, folder_name):
         """Delete folder if it has no queries or charts"""
         folder = frappe.get_doc("Insights Folder", folder_name)
@@ -85,62 +144,226 @@ class InsightsQueryv3(Document):
         if not operations:
             return
 
-        linked_queries = []
-        for operation in operations:
-            if (
-                operation.get("table")
-                and operation.get("table").get("type") == "query"
-                and operation.get("table").get("query_name")
-            ):
-                linked_queries.append(operation.get("table").get("query_name"))
-        self.linked_queries = linked_queries
+        self.linked_queries = get_linked_queries(operations)
 
     def build(self, active_operation_idx=None, use_live_connection=None):
-        builder = IbisQueryBuilder(self, active_operation_idx)
-        builder.use_live_connection = (
-            use_live_connection if use_live_connection is not None else self.use_live_connection
-        )
-        ibis_query = builder.build()
+        if use_live_connection is None:
+            use_live_connection = self.use_live_connection
 
-        if ibis_query is None:
-            frappe.throw("Failed to build query")
+        build_key = self.get_build_key(active_operation_idx, use_live_connection)
+        with track_permission_versions() as permission_versions:
+            if build_key and (ibis_query := get_cached_build(build_key)) is not None:
+                return ibis_query
+
+            builder = IbisQueryBuilder(self, active_operation_idx)
+            builder.use_live_connection = use_live_connection
+            ibis_query = builder.build()
+
+            if ibis_query is None:
+                frappe.throw("Failed to build query")
+
+            if build_key:
+                ibis_query = cache_build(build_key, ibis_query, permission_versions)
 
         return ibis_query
 
+    def get_build_key(self, active_operation_idx, use_live_connection):
+        # the build depends on the operations of this query & the queries it reads from,
+        # the adhoc filters applied on it and the permissions of the current user
+        linked_query_versions = get_linked_query_versions(self.operations)
+        if linked_query_versions is None:
+            return None
+
+        adhoc_filters = getattr(frappe.local, "insights_adhoc_filters", None) or {}
+        queries = [self.name] + [name for name, _modified in linked_query_versions]
+        adhoc_filters = {name: adhoc_filters[name] for name in queries if adhoc_filters.get(name)}
+
+        return make_digest(
+            self.name,
+            self.operations,
+            linked_query_versions,
+            active_operation_idx,
+            use_live_connection,
+            adhoc_filters,
+            get_permission_fingerprint(),
+        )
+
     @frappe.whitelist()
     def execute(self, active_operation_idx=None, adhoc_filters=None, force=False):
         with set_adhoc_filters(adhoc_filters):
             ibis_query = self.build(active_operation_idx)
 
-        limit = 100
+        limit = self.get_limit()
+        sql = ibis.to_sql(ibis_query)
+        cache_key = self.get_response_cache_key(ibis_query, sql, limit)
+        if not force and (response := get_cached_response(cache_key)):
+            return {**response, "time_taken": -1}
+
+        # only the response is cached, so results are not cached separately by `execute_ibis_query`
+        with coalesce_execution(cache_key) as waited:
+            if waited and (response := get_cached_response(cache_key)):
+                return {**response, "time_taken": -1}
+
+            results, time_taken = execute_ibis_query(
+                ibis_query,
+                limit,
+                cache=False,
+                reference_doctype=self.doctype,
+                reference_name=self.name,
+            )
+            response = self.get_response(ibis_query, sql, results, time_taken)
+            cache_response(cache_key, response, cache_expiry=get_cache_expiry(ibis_query, RESPONSE_CACHE_EXPIRY))
+
+        return response
+
+    def get_limit(self, default=100):
         for op in frappe.parse_json(self.operations):
             if op.get("limit"):
-                limit = op.get("limit")
-                break
+                return op.get("limit")
+        return default
+
+    @insights_whitelist()
+    def execute_page(
+        self,
+        offset=0,
+        page_size=100,
+        sort=None,
+        active_operation_idx=None,
+        adhoc_filters=None,
+        force=False,
+    ):
+        """
+        Returns a page of the results, sorted by `sort`.
+
+        `sort` is a list of `{"column": name, "direction": "asc" | "desc"}`.
+
+        The results are executed once and kept in the result cache, the following pages
+        and sorts are served from the cached results without querying the data source again.
+        """
+        with set_adhoc_filters(adhoc_filters):
+            ibis_query = self.build(active_operation_idx)
 
+        paged_query, truncated_at = self.get_paged_query(ibis_query)
         results, time_taken = execute_ibis_query(
-            ibis_query,
-            limit,
+            paged_query,
+            limit=None,
             force=force,
-            cache_expiry=60 * 10,
             reference_doctype=self.doctype,
             reference_name=self.name,
         )
-        results = results.to_dict(orient="records")
 
-        columns = get_columns_from_schema(ibis_query.schema())
+        sort = [s for s in frappe.parse_json(sort) or [] if s.get("column") in results.columns]
+        truncated = truncated_at is not None and len(results) >= truncated_at
+        if sort and truncated:
+            # only the first rows are cached, so the rest of the rows have to be sorted by the data source
+            order_by = [
+                ibis.desc(s["column"]) if s.get("direction") == "desc" else ibis.asc(s["column"])
+                for s in sort
+            ]
+            results, time_taken = execute_ibis_query(
+                limit_query(ibis_query.order_by(order_by), truncated_at),
+                limit=None,
+                force=force,
+                reference_doctype=self.doctype,
+                reference_name=self.name,
+            )
+        elif sort:
+            results = results.sort_values(
+                by=[s["column"] for s in sort],
+                ascending=[s.get("direction") != "desc" for s in sort],
+                kind="stable",
+                na_position="last",
+            )
+
+        offset = max(cint(offset), 0)
+        page_size = min(max(cint(page_size), 1), MAX_PAGE_SIZE)
+        page = results.iloc[offset : offset + page_size]
+        return {
+            "columns": get_columns_from_schema(ibis_query.schema()),
+            "rows": page.to_dict(orient="records"),
+            # the count is unknown if the results were truncated to the limit
+            "total_count": None if truncated else len(results),
+            "time_taken": time_taken,
+        }
+
+    def get_paged_query(self, ibis_query):
+        """
+        Returns the query limited to the rows kept for paging, and the number of rows at which
+        its results are truncated. The results of queries with a limit up to `PAGED_RESULTS_LIMIT`
+        are never truncated, since they have all the rows of the query.
+        """
+        limit = cint(self.get_limit(default=0))
+        if limit and limit <= PAGED_RESULTS_LIMIT:
+            return limit_query(ibis_query, limit), None
+        return limit_query(ibis_query, PAGED_RESULTS_LIMIT), PAGED_RESULTS_LIMIT
+
+    def get_response_cache_key(self, ibis_query, sql, limit):
+        return make_digest(get_cache_key(ibis_query, sql), limit)
+
+    def get_response(self, ibis_query, sql, results, time_taken):
         return {
-            "sql": ibis.to_sql(ibis_query),
-            "columns": columns,
-            "rows": results,
+            "sql": sql,
+            "columns": get_columns_from_schema(ibis_query.schema()),
+            "rows": results.to_dict(orient="records"),
             "time_taken": time_taken,
         }
 
+    @insights_whitelist()
+    def enqueue_materialize_results(self):
+        job_id = f"insights_materialize_query_{self.name}"
+        if is_job_enqueued(job_id):
+            return
+
+        frappe.enqueue_doc(
+            self.doctype,
+            self.name,
+            "materialize_results",
+            queue="long",
+            timeout=6000,
+            job_id=job_id,
+            enqueue_after_commit=True,
+        )
+
+    def materialize_results(self):
+        with db_connections():
+            ibis_query = self.build()
+            table_name = Warehouse().store_query_results(self.name, ibis_query)
+
+        # the results of the queries that read from this query are invalidated
+        bump_table_version(table_name)
+        self.db_set("materialized_on", frappe.utils.now(), update_modified=False)
+
+    def get_materialized_results(self):
+        # the stored results are not filtered by the dashboard filters or the permissions of the user,
+        # so they are only used when permissions are disabled & no dashboard filters are applied
+        if not self.materialize or not self.materialized_on or get_permission_fingerprint():
+            return None
+
+        adhoc_filters = getattr(frappe.local, "insights_adhoc_filters", None) or {}
+        if adhoc_filters:
+            linked_query_versions = get_linked_query_versions(self.operations)
+            if linked_query_versions is None:
+                return None
+            queries = [self.name] + [name for name, _modified in linked_query_versions]
+            if any(adhoc_filters.get(name) for name in queries):
+                return None
+
+        return Warehouse().get_query_results(self.name)
+
+    def is_materialization_due(self):
+        from croniter import croniter
+
+        cron = self.materialize_cron or "0 0 * * *"
+        start_time = get_datetime(self.materialized_on or datetime(2000, 1, 1))
+        return croniter(cron, start_time).get_next(datetime) <= now_datetime()
+
     @insights_whitelist()
     def format(self, raw_sql):
         if not raw_sql or not self.is_native_query:
             return raw_sql
 
+        import sqlparse
+
         return sqlparse.format(str(raw_sql), reindent=True, keyword_case="upper")
 
     @insights_whitelist()
@@ -148,6 +371,12 @@ class InsightsQueryv3(Document):
         with set_adhoc_filters(adhoc_filters):
             ibis_query = self.build(active_operation_idx)
 
+        # the results cached for paging have all the rows, unless they were truncated to the limit
+        paged_query, truncated_at = self.get_paged_query(ibis_query)
+        row_count = get_cached_row_count(get_cache_key(paged_query))
+        if row_count is not None and (truncated_at is None or row_count < truncated_at):
+            return row_count
+
         count_query = ibis_query.aggregate(count=_.count())
         count_results, time_taken = execute_ibis_query(
             count_query,
@@ -178,6 +407,14 @@ class InsightsQueryv3(Document):
         else:
             return results.to_csv(index=False)
 
+    @insights_whitelist()
+    def enqueue_export(self, format="csv", active_operation_idx=None, adhoc_filters=None):
+        return enqueue_export(self, format, active_operation_idx, adhoc_filters)
+
+    @insights_whitelist()
+    def get_export_status(self, export_id):
+        return get_export_status(export_id)
+
     @insights_whitelist()
     def get_distinct_column_values(
         self,
@@ -310,8 +547,80 @@ def import_query(query, workbook):
     return new_query.name
 
 
+def materialize_queries():
+    # called by the scheduler, refreshes the stored results of the queries that are due
+    if get_permission_fingerprint():
+        # stored results are not used when permissions are enabled
+        return
+
+    queries = frappe.get_all("Insights Query v3", filters={"materialize": 1}, pluck="name")
+    for query in queries:
+        doc = frappe.get_cached_doc("Insights Query v3", query)
+        if doc.is_materialization_due():
+            doc.enqueue_materialize_results()
+
+
+def get_linked_queries(operations) -> list[str]:
+    linked_queries = []
+    for operation in frappe.parse_json(operations) or []:
+        if (
+            operation.get("table")
+            and operation.get("table").get("type") == "query"
+            and operation.get("table").get("query_name")
+        ):
+            linked_queries.append(operation.get("table").get("query_name"))
+    return linked_queries
+
+
+def get_linked_query_versions(operations) -> list | None:
+    # returns the (name, modified) of all the queries this query reads from, directly or indirectly
+    # or None if any of the queries can't be cached
+    if has_uncacheable_operations(operations):
+        return None
+
+    linked_queries = get_linked_queries(operations)
+    if not linked_queries:
+        return []
+
+    key = make_digest(sorted(linked_queries))
+    versions = frappe.cache().hget(LINKED_QUERY_VERSIONS_CACHE_KEY, key)
+    if versions is None:
+        versions = _get_linked_query_versions(linked_queries)
+        frappe.cache().hset(LINKED_QUERY_VERSIONS_CACHE_KEY, key, False if versions is None else versions)
+    return None if versions is False else versions
+
+
+def _get_linked_query_versions(linked_queries: list[str]) -> list | None:
+    versions = []
+    visited = set()
+    to_visit = set(linked_queries)
+    while to_visit:
+        queries = frappe.get_all(
+            "Insights Query v3",
+            filters={"name": ["in", list(to_visit)]},
+            fields=["name", "modified", "operations"],
+        )
+        visited.update(to_visit)
+        to_visit = set()
+        for query in queries:
+            if has_uncacheable_operations(query.operations):
+                return None
+            versions.append((query.name, str(query.modified)))
+            to_visit.update(set(get_linked_queries(query.operations)) - visited)
+
+    return sorted(versions)
+
+
+def get_permission_fingerprint():
+    # builds are shared between users only if no permissions are applied while building
+    if frappe.db.get_single_value(
+        "Insights Settings", "enable_permissions", cache=True
+    ) or frappe.db.get_single_value("Insights Settings", "apply_user_permissions", cache=True):
+        return (frappe.session.user, get_permission_version())
+
+
 @contextmanager
 def set_adhoc_filters(filters):
-    frappe.local.insights_adhoc_filters = filters or getattr(frappe.local, "insights_adhoc_filters", {})
+    frappe.local.insights_adhoc_filters = filters or getattr(frappe.local, "insights_adhoc_filters", None) or {}
     yield
     frappe.local.insights_adhoc_filters = None
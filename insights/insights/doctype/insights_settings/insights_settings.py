@@ -24,6 +24,7 @@ class InsightsSettings(Document):
         enable_data_store: DF.Check
         enable_permissions: DF.Check
         fiscal_year_start: DF.Date | None
+        import_workers: DF.Int
         max_execution_time: DF.Int
         max_memory_usage: DF.Int
         max_records_to_sync: DF.Int
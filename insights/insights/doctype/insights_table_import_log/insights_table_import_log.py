@@ -17,6 +17,7 @@ class InsightsTableImportLog(Document):
         batch_size: DF.Int
         data_source: DF.Data
         ended_at: DF.Datetime | None
+        incremental: DF.Check
         memory_limit: DF.Int
         output: DF.LongText | None
         parquet_file: DF.Text | None
@@ -28,6 +29,7 @@ class InsightsTableImportLog(Document):
         status: DF.Literal["In Progress", "Completed", "Failed"]
         table_name: DF.Data
         time_taken: DF.Int
+        watermark: DF.Data | None
     # end: auto-generated types
 
     def log_output(self, message: str, commit: bool = False):
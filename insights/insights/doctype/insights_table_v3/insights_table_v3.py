@@ -1,17 +1,43 @@
 # Copyright (c) 2022, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
-
+import os
+import time
+from contextlib import contextmanager
 from hashlib import md5
 
 import frappe
+import ibis
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import sqlglot as sg
 from frappe.model.document import Document
 from frappe.permissions import get_valid_perms
+from frappe.utils import get_files_path
 
 from insights import create_toast
 from insights.insights.doctype.insights_data_source_v3.data_warehouse import Warehouse
+from insights.insights.doctype.insights_data_source_v3.result_cache import (
+    from_arrow_ipc,
+    get_hash_values,
+    to_arrow_ipc,
+)
 from insights.utils import InsightsDataSourcev3
 
+# hash of doctype -> version, a version changes every time the permissions of the doctype change
+PERMISSION_VERSIONS_KEY = "insights:permission_versions"
+# version of the permissions that apply to all doctypes, like roles & user permissions
+ALL_DOCTYPES = "*"
+ALLOWED_DOCUMENTS_KEY_PREFIX = "insights:allowed_documents:"
+ALLOWED_DOCUMENTS_CACHE_EXPIRY = 60 * 10
+# larger lists of allowed documents are semi joined with a parquet file of the names in the warehouse
+# instead of embedded in the filter, queries on live connections always embed them
+MAX_ALLOWED_DOCUMENTS_IN_FILTER = 1000
+ALLOWED_DOCUMENTS_FOLDER_NAME = "insights_allowed_documents"
+# files of allowed documents that are not used for a day are deleted
+ALLOWED_DOCUMENTS_FILE_EXPIRY = 60 * 60 * 24
+
 
 class InsightsTablev3(Document):
     # begin: auto-generated types
@@ -26,9 +52,12 @@ class InsightsTablev3(Document):
         data_source: DF.Link
         label: DF.Data
         last_synced_on: DF.Datetime | None
+        partition_column: DF.Data | None
         row_limit: DF.Int
         stored: DF.Check
+        sync_mode: DF.Literal["Full", "Append", "Upsert"]
         table: DF.Data
+        watermark: DF.Data | None
     # end: auto-generated types
 
     def autoname(self):
@@ -91,21 +120,21 @@ class InsightsTablev3(Document):
             t = ds.get_ibis_table(table_name)
 
         t = apply_table_restrictions(t, data_source, table_name)
-        t = apply_user_permissions(t, data_source, table_name)
+        t = apply_user_permissions(t, data_source, table_name, use_live_connection)
         return t
 
     @frappe.whitelist()
-    def import_to_warehouse(self):
+    def import_to_warehouse(self, incremental=False):
         frappe.only_for("Insights Admin")
         wt = Warehouse().get_table(self.data_source, self.table)
-        wt.enqueue_import()
+        wt.enqueue_import(incremental=frappe.utils.sbool(incremental))
 
 
 def get_table_name(data_source, table):
     return md5((data_source + table).encode()).hexdigest()[:10]
 
 
-def apply_user_permissions(t, data_source, table_name):
+def apply_user_permissions(t, data_source, table_name, use_live_connection=False):
     if not frappe.db.get_single_value("Insights Settings", "apply_user_permissions", cache=True):
         return t
 
@@ -122,17 +151,139 @@ def apply_user_permissions(t, data_source, table_name):
         return t.filter(t.doctype.isin(allowed_single_doctypes))
 
     doctype = table_name.replace("tab", "")
-    allowed_docs = get_allowed_documents(doctype)
+    allowed_docs = get_cached_allowed_documents(doctype)
 
     if allowed_docs == "*":
         return t
-    if isinstance(allowed_docs, list):
+    if isinstance(allowed_docs, list) and (
+        use_live_connection or len(allowed_docs) <= MAX_ALLOWED_DOCUMENTS_IN_FILTER
+    ):
         return t.filter(t.name.isin(allowed_docs))
+    if isinstance(allowed_docs, list):
+        return t.semi_join(get_allowed_documents_table(allowed_docs), "name")
 
     create_toast("You do not have permissions to access this table", type="error")
     return t.filter(False)
 
 
+def get_cached_allowed_documents(doctype):
+    """
+    Returns the allowed documents of the doctype for the current user, cached until the permissions change.
+
+    The names are cached as a compressed arrow table, since a user can be allowed to read
+    hundreds of thousands of documents.
+    """
+    version = get_permission_version(doctype)
+    track_permission_version(doctype, version)
+
+    key = f"{ALLOWED_DOCUMENTS_KEY_PREFIX}{frappe.session.user}:{doctype}:{version}"
+    cached = frappe.cache().get_value(key)
+    if cached == "*":
+        return cached
+    if cached is not None:
+        return from_arrow_ipc(cached)["name"].tolist()
+
+    docs = get_allowed_documents(doctype)
+    if isinstance(docs, list):
+        cached = to_arrow_ipc(pd.DataFrame({"name": pd.Series(docs, dtype="string")}))
+    else:
+        cached = docs
+    frappe.cache().set_value(key, cached, expires_in_sec=ALLOWED_DOCUMENTS_CACHE_EXPIRY)
+    return docs
+
+
+def get_allowed_documents_table(names: list[str]):
+    """
+    Returns a warehouse query that reads the names from a parquet file, named by its contents.
+
+    Unlike an in-memory table, the file doesn't have to be registered on the connection before
+    the query is executed, so the builds of the queries that use it can be cached.
+    """
+    folder = get_allowed_documents_folder()
+    names = sorted(names)
+    path = os.path.join(folder, f"{md5(chr(0).join(names).encode()).hexdigest()}.parquet")
+    if os.path.exists(path):
+        # mark as recently used
+        os.utime(path)
+    else:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(pa.table({"name": pa.array(names, type=pa.string())}), tmp_path)
+        os.replace(tmp_path, path)
+
+    source = sg.exp.Literal.string(path).sql("duckdb")
+    return Warehouse().db.sql(
+        f"SELECT name FROM read_parquet({source})",
+        schema=ibis.schema({"name": "string"}),
+    )
+
+
+def get_allowed_documents_folder() -> str:
+    path = os.path.realpath(get_files_path(is_private=1))
+    path = os.path.join(path, ALLOWED_DOCUMENTS_FOLDER_NAME)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+
+def delete_unused_allowed_documents():
+    # called by the scheduler
+    folder = get_allowed_documents_folder()
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < time.time() - ALLOWED_DOCUMENTS_FILE_EXPIRY:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+
+
+def get_permission_version(doctype=ALL_DOCTYPES) -> str:
+    return get_permission_versions([doctype])[doctype]
+
+
+def get_permission_versions(doctypes) -> dict[str, str]:
+    # the version of a doctype also changes when the permissions of all doctypes change
+    keys = sorted({ALL_DOCTYPES, *doctypes})
+    versions = dict(zip(keys, get_hash_values(PERMISSION_VERSIONS_KEY, keys), strict=True))
+    all_doctypes = versions[ALL_DOCTYPES] or ""
+    return {doctype: f"{all_doctypes}:{versions[doctype] or ''}" for doctype in doctypes}
+
+
+def bump_permission_version(doc=None, method=None):
+    # invalidates the cached allowed documents of the doctypes whose permissions changed,
+    # shares only change the permissions of the shared doctype & its child tables
+    doctypes = [ALL_DOCTYPES]
+    if doc and doc.doctype == "DocShare" and doc.share_doctype:
+        meta = frappe.get_meta(doc.share_doctype)
+        doctypes = [doc.share_doctype, *(df.options for df in meta.get_table_fields())]
+
+    for doctype in doctypes:
+        frappe.cache().hset(PERMISSION_VERSIONS_KEY, doctype, frappe.generate_hash(length=10))
+
+
+@contextmanager
+def track_permission_versions():
+    """
+    Collects the permission versions of the doctypes whose allowed documents are applied in the block,
+    they're added to the enclosing block as well, since a query includes the queries it reads from.
+    """
+    previous = getattr(frappe.local, "insights_permission_versions", None)
+    versions = {}
+    frappe.local.insights_permission_versions = versions
+    try:
+        yield versions
+    finally:
+        frappe.local.insights_permission_versions = previous
+        if previous is not None:
+            previous.update(versions)
+
+
+def track_permission_version(doctype: str, version: str):
+    versions = getattr(frappe.local, "insights_permission_versions", None)
+    if versions is not None:
+        versions[doctype] = version
+
+
 def get_allowed_documents(doctype):
     docs = []
 
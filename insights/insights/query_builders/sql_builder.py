@@ -9,7 +9,7 @@ from insights.insights.doctype.insights_query.utils import Filter as AssistedQue
 from insights.insights.doctype.insights_query.utils import Join as AssistedQueryJoin
 from insights.insights.doctype.insights_query.utils import Query as AssistedQuery
 from insights.insights.doctype.insights_table_v3.insights_table_v3 import (
-    get_allowed_documents,
+    get_cached_allowed_documents,
 )
 
 from .legacy_query_builder import LegacyQueryBuilder
@@ -203,7 +203,7 @@ class SQLQueryBuilder:
                 star = sa_column("*", is_literal=True, _selectable=t)
                 t_name = sa_column("name", _selectable=t)
                 doctype = name.replace("tab", "")
-                allowed_names = get_allowed_documents(doctype)
+                allowed_names = get_cached_allowed_documents(doctype)
                 if not allowed_names:
                     self._tables[name] = select(star).where(t_name.is_(None)).cte(name)
                 elif allowed_names == "*":
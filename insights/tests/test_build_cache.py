@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import ibis
+import pandas as pd
+
+from insights.insights.doctype.insights_data_source_v3 import ibis_utils
+from insights.insights.doctype.insights_data_source_v3.ibis_utils import (
+    cache_build,
+    get_cached_build,
+    limit_query,
+)
+
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.db = ibis.duckdb.connect()
+        self.table = self.db.create_table(
+            "build_cache_test",
+            pd.DataFrame({"id": range(10), "status": ["Open", "Closed"] * 5}),
+        )
+
+        cached = {}
+        cache = MagicMock()
+        cache.set_value.side_effect = lambda key, value, **kwargs: cached.update({key: value})
+        cache.get_value.side_effect = cached.get
+        self.patches = [
+            patch.object(ibis_utils.frappe, "cache", return_value=cache),
+            patch.object(ibis_utils, "get_portable_backend_name", return_value="test_db"),
+            patch.object(ibis_utils, "get_backend", return_value=self.db),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.db.disconnect()
+
+    def test_same_sql_for_fresh_and_cached_builds(self):
+        query = self.table.filter(self.table.status == "Open").select("id")
+        fresh = cache_build("build_key", query)
+        cached = get_cached_build("build_key")
+
+        # the result cache keys are computed from the sql of the limited query
+        self.assertEqual(ibis.to_sql(limit_query(fresh)), ibis.to_sql(limit_query(cached)))
+        self.assertEqual(fresh.schema(), query.schema())
+        self.assertEqual(len(fresh.execute()), 5)
+
+    def test_build_is_discarded_after_permission_change(self):
+        query = self.table.select("id")
+        versions = {"Sales Order": "1:1"}
+        with patch.object(ibis_utils, "get_permission_versions", return_value=versions):
+            cache_build("build_key", query, permission_versions=versions)
+            self.assertIsNotNone(get_cached_build("build_key"))
+
+        with patch.object(ibis_utils, "get_permission_versions", return_value={"Sales Order": "1:2"}):
+            self.assertIsNone(get_cached_build("build_key"))
@@ -0,0 +1,103 @@
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import ibis
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from insights.insights.doctype.insights_query_v3 import export
+from insights.insights.doctype.insights_query_v3.export import write_export
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.db = ibis.duckdb.connect()
+        self.rows = 25
+        self.table = self.db.create_table(
+            "export_test",
+            pd.DataFrame(
+                {
+                    "id": range(self.rows),
+                    "name": [f"Row {idx}" for idx in range(self.rows)],
+                    "created": pd.date_range("2024-01-01", periods=self.rows, freq="h"),
+                }
+            ),
+        )
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.db.disconnect()
+        self.folder.cleanup()
+
+    def export(self, format):
+        path = os.path.join(self.folder.name, f"export.{export.FILE_EXTENSIONS[format]}")
+        progress = []
+        # small batches, to check that the rows of every batch are written
+        with patch.object(export, "EXPORT_BATCH_SIZE", 10):
+            rows, truncated = write_export(self.table, path, format, progress.append)
+        self.assertEqual(rows, self.rows)
+        self.assertFalse(truncated)
+        self.assertEqual(progress[-1], self.rows)
+        return path
+
+    def test_csv_export(self):
+        path = self.export("csv")
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["id", "name", "created"])
+        self.assertEqual(len(rows), self.rows + 1)
+
+    def test_parquet_export(self):
+        path = self.export("parquet")
+        table = pq.read_table(path)
+        self.assertEqual(table.num_rows, self.rows)
+        self.assertEqual(table.column("name").to_pylist()[-1], f"Row {self.rows - 1}")
+
+    def test_excel_export(self):
+        from openpyxl import load_workbook
+
+        path = self.export("excel")
+        sheet = load_workbook(path, read_only=True).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0], ("id", "name", "created"))
+        self.assertEqual(len(rows), self.rows + 1)
+
+    def test_arrow_export(self):
+        path = self.export("arrow")
+        with pa.ipc.open_file(path) as reader:
+            table = reader.read_all()
+        self.assertEqual(table.num_rows, self.rows)
+        self.assertEqual(table.schema.names, ["id", "name", "created"])
+
+    def test_warehouse_export(self):
+        # the warehouse writes the file with COPY, without fetching the rows
+        for format in ("csv", "parquet"):
+            with self.subTest(format=format):
+                path = os.path.join(self.folder.name, f"copy.{export.FILE_EXTENSIONS[format]}")
+                query = self.table.filter(self.table.id < 20)
+                with (
+                    patch.object(export, "is_warehouse_query", return_value=True),
+                    patch.object(type(query), "to_pyarrow_batches") as to_pyarrow_batches,
+                ):
+                    rows, _ = write_export(query, path, format)
+                to_pyarrow_batches.assert_not_called()
+                self.assertEqual(rows, 20)
+                df = pd.read_csv(path) if format == "csv" else pd.read_parquet(path)
+                self.assertEqual(len(df), 20)
+
+    def test_non_streaming_export_is_truncated(self):
+        # backends that fetch the whole result into memory are limited to `MAX_EXPORT_ROWS`
+        path = os.path.join(self.folder.name, "truncated.csv")
+        with (
+            patch.object(export, "is_streaming_query", return_value=False),
+            patch.object(export, "MAX_EXPORT_ROWS", 15),
+            patch.object(export, "EXPORT_BATCH_SIZE", 10),
+        ):
+            rows, truncated = write_export(self.table, path, "csv")
+        self.assertEqual(rows, 15)
+        self.assertTrue(truncated)
+        self.assertEqual(len(pd.read_csv(path)), 15)
@@ -5,8 +5,10 @@ import ibis
 
 from frappe.exceptions import ValidationError
 
+from insights.insights.doctype.insights_data_source_v3.ibis.utils import get_functions
 from insights.insights.doctype.insights_data_source_v3.ibis_utils import (
     IbisQueryBuilder,
+    parse_script,
 )
 
 
@@ -114,3 +116,26 @@ class TestIbisUtilsEvaluateExpression(unittest.TestCase):
         with self.assertRaises(ValueError):
             builder.evaluate_expression(" ")
 
+    def test_columns_are_reused_until_query_changes(self):
+        """Expressions on the same query should not rebuild the columns."""
+        builder = self._build_builder_with_schema()
+        columns = builder.get_current_columns()
+        self.assertIs(builder.get_current_columns(), columns)
+
+        builder.query = builder.query.mutate(Total=builder.query.Price * 2)
+        self.assertIsNot(builder.get_current_columns(), columns)
+        self.assertIn("Total", builder.get_current_columns())
+
+    def test_functions_are_frozen(self):
+        """The function registry should be built once and be read-only."""
+        functions = get_functions()
+        self.assertIs(get_functions(), functions)
+        with self.assertRaises(TypeError):
+            functions["sum"] = None
+        with self.assertRaises(TypeError):
+            functions.ibis.case = None
+
+    def test_parse_script(self):
+        """A script should be split into the statements to run and the expression to return."""
+        self.assertEqual(parse_script("Price * 2"), ("", "Price * 2"))
+        self.assertEqual(parse_script("x = Price * 2\ny = x + 1"), ("x = Price * 2", "y"))
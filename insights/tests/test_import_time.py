@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import unittest
+
+# modules loaded by every request and background job
+REQUEST_MODULES = (
+    "insights.insights.doctype.insights_data_source_v3.insights_data_source_v3",
+    "insights.insights.doctype.insights_query_v3.insights_query_v3",
+    "insights.insights.doctype.insights_dashboard_v3.insights_dashboard_v3",
+    "insights.insights.doctype.insights_alert.insights_alert",
+)
+# the api and the modules behind the query editor, which defer the imports to the functions that need them
+API_MODULES = (
+    "insights.api",
+    "insights.insights.doctype.insights_data_source_v3.ibis.utils",
+)
+# frappe modules used by insights, whatever they import can't be deferred by insights
+FRAPPE_MODULES = (
+    "frappe",
+    "frappe.model.document",
+    "frappe.utils.background_jobs",
+    "frappe.utils.safe_exec",
+    "frappe.query_builder",
+)
+# only needed by the query editor, alerts, schedules and dashboard previews
+DEFERRED_MODULES = ("jedi", "telegram", "croniter", "sqlparse", "requests", "PIL")
+
+
+def get_import_statement(modules) -> str:
+    return "; ".join(f"import {module}" for module in modules)
+
+
+def get_imported_modules(modules) -> set[str]:
+    # top level packages in `sys.modules` after importing the modules
+    statement = get_import_statement(modules) + "; import sys; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {module.split(".")[0] for module in result.stdout.split()}
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.frappe_modules = get_imported_modules(FRAPPE_MODULES)
+
+    def test_deferred_modules_are_not_imported(self):
+        for module in REQUEST_MODULES + API_MODULES:
+            with self.subTest(module=module):
+                loaded = get_imported_modules((*FRAPPE_MODULES, module)) - self.frappe_modules
+                self.assertFalse(loaded & set(DEFERRED_MODULES))
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import ibis
+import pandas as pd
+
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+    WarehouseTableImporter,
+)
+
+
+class TestIncrementalSync(unittest.TestCase):
+    def setUp(self):
+        self.db = ibis.duckdb.connect()
+        self.rows = pd.DataFrame(
+            {
+                "id": range(30),
+                "creation": pd.date_range("2024-01-01", periods=30, freq="h"),
+            }
+        )
+        self.remote_table = self.db.create_table("sync_test", self.rows)
+
+        # the first 10 rows are already synced
+        self.folder = tempfile.TemporaryDirectory()
+        self.parquet_path = os.path.join(self.folder.name, "sync_test.parquet")
+        self.rows.head(10).to_parquet(self.parquet_path)
+
+    def tearDown(self):
+        self.db.disconnect()
+        self.folder.cleanup()
+
+    def get_new_rows(self, watermark, row_limit):
+        table = MagicMock(parquet_filepath=self.parquet_path)
+        table.get_remote_table.return_value = self.remote_table
+
+        importer = WarehouseTableImporter(table, incremental=True)
+        importer.log = MagicMock()
+        importer.settings.update(
+            {
+                "row_limit": row_limit,
+                "sync_mode": "Append",
+                "watermark_column": "creation",
+                "watermark": str(watermark),
+                "incremental": True,
+                "before_import_script": "",
+            }
+        )
+        importer.prepare_remote_table()
+        return importer.remote_table.execute()
+
+    def test_more_new_rows_than_row_limit(self):
+        watermark = self.rows.creation[9]
+        synced = []
+        while True:
+            new_rows = self.get_new_rows(watermark, row_limit=7)
+            if new_rows.empty:
+                break
+            self.assertLessEqual(len(new_rows), 7)
+            synced.extend(new_rows.id)
+            watermark = new_rows.creation.max()
+
+        # rows left out by the row limit are synced by the next runs
+        self.assertEqual(sorted(synced), list(range(10, 30)))
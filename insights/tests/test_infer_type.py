@@ -0,0 +1,80 @@
+import random
+import time
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+
+from insights.insights.doctype.insights_query.utils import (
+    infer_type,
+    infer_type_from_list,
+    infer_types,
+)
+
+
+def infer_type_per_value(values):
+    # the implementation before the types were inferred a column at a time
+    inferred_types = [infer_type(v) for v in values]
+    if "String" in inferred_types:
+        return "String"
+    elif "Decimal" in inferred_types:
+        return "Decimal"
+    elif "Integer" in inferred_types:
+        return "Integer"
+    elif "Datetime" in inferred_types:
+        return "Datetime"
+    else:
+        return "String"
+
+
+class TestInferType(unittest.TestCase):
+    def get_sample_columns(self, rows=1000):
+        rng = random.Random(42)
+        return {
+            "ints": [rng.randint(-1000, 1000) for _ in range(rows)],
+            "floats": [rng.random() * 100 for _ in range(rows)],
+            "whole_floats": [float(rng.randint(0, 100)) for _ in range(rows)],
+            "int_strings": [str(rng.randint(0, 1000)) for _ in range(rows)],
+            "decimal_strings": [f"{rng.random() * 100:.2f}" for _ in range(rows)],
+            "date_strings": [f"2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}" for _ in range(rows)],
+            "text": [rng.choice(["alpha", "beta", "gamma"]) for _ in range(rows)],
+            "dates": [date(2024, 1, rng.randint(1, 28)) for _ in range(rows)],
+            "datetimes": [datetime(2024, 1, 1, rng.randint(0, 23)) for _ in range(rows)],
+            "decimals": [Decimal(rng.randint(0, 100)) / 4 for _ in range(rows)],
+            "mixed": [rng.choice([1, 1.5, "2", "x", None]) for _ in range(rows)],
+            "nulls": [None] * rows,
+            "nan_strings": ["nan", "1", "NaN", "2.5"] * (rows // 4),
+            "special_floats": [float("nan"), float("inf"), 1.0] * (rows // 3),
+            "bools": [True, False] * (rows // 2),
+            "big_ints": [2**64, 1, -(2**70)] * (rows // 3),
+            "numbers_then_text": [str(i) for i in range(rows - 1)] + ["total"],
+            "empty": [],
+        }
+
+    def test_same_types_as_per_value_inference(self):
+        for name, values in self.get_sample_columns(rows=60).items():
+            with self.subTest(column=name):
+                self.assertEqual(infer_type_from_list(values), infer_type_per_value(values))
+
+    def test_numeric_types(self):
+        self.assertEqual(infer_types([1, 2, 3]), {"Integer"})
+        self.assertEqual(infer_types([1, 2.5]), {"Integer", "Decimal"})
+        self.assertEqual(infer_types(["1", "2.0"]), {"Integer"})
+        self.assertEqual(infer_types(["abc", "1"]), {"String", "Integer"})
+
+    def test_benchmark(self):
+        columns = list(self.get_sample_columns(rows=1000).values()) * 3
+
+        start = time.perf_counter()
+        expected = [infer_type_per_value(values) for values in columns]
+        per_value_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        inferred = [infer_type_from_list(values) for values in columns]
+        column_time = time.perf_counter() - start
+
+        print(
+            f"\ninfer type of {len(columns)} columns: "
+            f"per value {per_value_time:.3f}s, per column {column_time:.3f}s"
+        )
+        self.assertEqual(inferred, expected)
+        self.assertLess(column_time, per_value_time)
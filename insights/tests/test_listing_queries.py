@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from insights.api.dashboards import get_dashboards
+from insights.api.workbooks import get_workbooks
+
+# workbooks added between two counts of the queries run by a listing
+ADDED_WORKBOOKS = 10
+
+
+class TestListingQueries(unittest.TestCase):
+    # the number of queries run by the listings should not grow with the number of items listed
+
+    def setUp(self):
+        frappe.set_user("Administrator")
+        self.workbooks = []
+
+    def tearDown(self):
+        for workbook in self.workbooks:
+            frappe.db.delete("Insights Dashboard v3", {"workbook": workbook})
+            frappe.db.delete("View Log", {"reference_name": workbook})
+            frappe.db.delete("DocShare", {"share_name": workbook})
+            frappe.db.delete("Insights Workbook", workbook)
+        frappe.db.rollback()
+
+    def create_workbooks(self, count):
+        for idx in range(count):
+            workbook = frappe.get_doc(
+                {"doctype": "Insights Workbook", "title": f"Listing Test {idx}"}
+            ).insert()
+            self.workbooks.append(workbook.name)
+
+            dashboard = frappe.get_doc(
+                {
+                    "doctype": "Insights Dashboard v3",
+                    "title": f"Listing Test {idx}",
+                    "workbook": workbook.name,
+                    "items": "[]",
+                }
+            ).insert()
+            workbook.add_viewed(force=True)
+            dashboard.add_viewed(force=True)
+            frappe.share.add_docshare(
+                "Insights Workbook",
+                workbook.name,
+                everyone=1,
+                flags={"ignore_share_permission": 1},
+            )
+
+    def count_queries(self, method):
+        # the first call fills the caches that the listing reads from
+        method()
+        with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+            method()
+        return sql.call_count
+
+    def assert_query_count_does_not_grow(self, method):
+        self.create_workbooks(2)
+        few = self.count_queries(method)
+        self.create_workbooks(ADDED_WORKBOOKS)
+        many = self.count_queries(method)
+        # a few incidental queries, like cache misses, are allowed, but not one per listed item
+        self.assertLess(many - few, ADDED_WORKBOOKS)
+
+    def test_workbook_listing_query_count(self):
+        self.assert_query_count_does_not_grow(get_workbooks)
+
+    def test_dashboard_listing_query_count(self):
+        self.assert_query_count_does_not_grow(get_dashboards)
+
+    def test_listing_counts(self):
+        self.create_workbooks(3)
+        workbooks = {w["name"]: w for w in get_workbooks()}
+        dashboards = {d["workbook"]: d for d in get_dashboards()}
+        for workbook in self.workbooks:
+            self.assertEqual(workbooks[workbook]["views"], 1)
+            self.assertTrue(workbooks[workbook]["shared_with_organization"])
+            self.assertEqual(dashboards[workbook]["views"], 1)
+            self.assertEqual(dashboards[workbook]["charts"], 0)
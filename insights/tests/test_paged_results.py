@@ -0,0 +1,33 @@
+import unittest
+from unittest.mock import MagicMock
+
+import ibis
+
+from insights.insights.doctype.insights_query_v3.insights_query_v3 import (
+    PAGED_RESULTS_LIMIT,
+    InsightsQueryv3,
+)
+
+
+class TestPagedResults(unittest.TestCase):
+    def setUp(self):
+        self.table = ibis.table({"id": "int64"}, name="paged_results_test")
+
+    def get_paged_query(self, limit):
+        query = MagicMock(get_limit=lambda default: limit or default)
+        return InsightsQueryv3.get_paged_query(query, self.table)
+
+    def test_results_within_query_limit_are_complete(self):
+        # results that reach the query's own limit have all of its rows
+        _, truncated_at = self.get_paged_query(limit=500)
+        self.assertIsNone(truncated_at)
+
+        _, truncated_at = self.get_paged_query(limit=PAGED_RESULTS_LIMIT)
+        self.assertIsNone(truncated_at)
+
+    def test_results_without_query_limit_are_truncated(self):
+        _, truncated_at = self.get_paged_query(limit=None)
+        self.assertEqual(truncated_at, PAGED_RESULTS_LIMIT)
+
+        _, truncated_at = self.get_paged_query(limit=PAGED_RESULTS_LIMIT * 2)
+        self.assertEqual(truncated_at, PAGED_RESULTS_LIMIT)
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from insights.insights.doctype.insights_dashboard_v3 import query_planner
+from insights.insights.doctype.insights_dashboard_v3.query_planner import (
+    share_common_prefixes,
+)
+
+SOURCE = {"type": "source", "table": {"type": "table", "data_source": "test", "table_name": "orders"}}
+FILTER = {"type": "filter", "expression": {"type": "expression", "expression": "status == 'Open'"}}
+MUTATE = {
+    "type": "mutate",
+    "new_name": "total",
+    "expression": {"type": "expression", "expression": "qty * 2"},
+}
+# the source of the data queries of the charts on a dashboard
+QUERY_SOURCE = {"type": "source", "table": {"type": "query", "query_name": "sales_query"}}
+
+
+def summarize(column):
+    return {"type": "summarize", "measures": [], "dimensions": [{"column_name": column}]}
+
+
+def chart_operations(column):
+    # data queries of charts are built as source, an optional filter group, summarize, order by & limit
+    return [
+        QUERY_SOURCE,
+        summarize(column),
+        {"type": "order_by", "column": {"type": "column", "column_name": column}, "direction": "asc"},
+        {"type": "limit", "limit": 100},
+    ]
+
+
+def get_query(name, operations):
+    return frappe._dict(name=name, operations=operations, use_live_connection=0)
+
+
+class TestQueryPlanner(unittest.TestCase):
+    def share(self, *operation_lists, adhoc_filters=None):
+        queries = {
+            f"query_{idx}": (get_query(f"query_{idx}", operations), adhoc_filters)
+            for idx, operations in enumerate(operation_lists)
+        }
+        with patch.object(query_planner, "materialize", return_value=None) as materialize:
+            share_common_prefixes(queries)
+        return materialize
+
+    def test_source_only_prefix_is_not_materialized(self):
+        # copying the whole source table would be slower than running each query
+        materialize = self.share(
+            [SOURCE, summarize("status")],
+            [SOURCE, summarize("customer")],
+        )
+        materialize.assert_not_called()
+
+    def test_prefix_without_filters_is_not_materialized(self):
+        materialize = self.share(
+            [SOURCE, MUTATE, summarize("status")],
+            [SOURCE, MUTATE, summarize("customer")],
+        )
+        materialize.assert_not_called()
+
+    def test_filtered_prefix_is_materialized(self):
+        materialize = self.share(
+            [SOURCE, FILTER, summarize("status")],
+            [SOURCE, FILTER, summarize("customer")],
+        )
+        materialize.assert_called_once()
+        self.assertEqual(materialize.call_args.args[0], [SOURCE, FILTER])
+
+    def test_chart_queries_share_their_source_query(self):
+        # charts of the same query only share the source, which is executed once for all of them
+        materialize = self.share(chart_operations("status"), chart_operations("customer"))
+        materialize.assert_called_once()
+        self.assertEqual(materialize.call_args.args[0], [QUERY_SOURCE])
+
+    def test_filtered_source_table_is_materialized(self):
+        filters = {"sales_query": {"type": "filter_group", "filters": [FILTER]}}
+        materialize = self.share(
+            [SOURCE, summarize("status")],
+            [SOURCE, summarize("customer")],
+            adhoc_filters=filters,
+        )
+        materialize.assert_called_once()
+        self.assertEqual(materialize.call_args.args[1], filters)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import frappe
+import ibis
+
+from insights.insights.doctype.insights_data_source_v3 import data_warehouse
+from insights.insights.doctype.insights_data_source_v3.data_warehouse import (
+    WAREHOUSE_DB_NAME,
+    Warehouse,
+)
+
+
+class TestWarehouseWrite(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.connections = getattr(frappe.local, "insights_db_connections", None)
+        frappe.local.insights_db_connections = {}
+
+        self.warehouse = Warehouse()
+        self.warehouse.db_path = os.path.join(self.folder.name, WAREHOUSE_DB_NAME)
+
+    def tearDown(self):
+        for db in frappe.local.insights_db_connections.values():
+            db.disconnect()
+        frappe.local.insights_db_connections = self.connections
+        self.folder.cleanup()
+
+    def test_write_after_read_in_the_same_request(self):
+        # queries on the warehouse open a read-only connection, which duckdb doesn't allow
+        # alongside a write connection to the same file in the same process
+        self.warehouse.db.raw_sql("SELECT 1").fetchall()
+
+        ddb = self.warehouse.connect_for_write(retries=1)
+        ddb.raw_sql("CREATE OR REPLACE VIEW test_view AS SELECT 1 AS value")
+        ddb.disconnect()
+
+        self.assertIn("test_view", self.warehouse.get_views())
+
+    def test_read_waits_for_write_lock(self):
+        # an import holds the write lock while it creates its views
+        self.warehouse.connect_for_write(retries=1).disconnect()
+        connect = ibis.duckdb.connect
+        attempts = []
+
+        def connect_after_lock(*args, **kwargs):
+            attempts.append(kwargs)
+            if len(attempts) < 3:
+                raise Exception("IO Error: Could not set lock on file")
+            return connect(*args, **kwargs)
+
+        with (
+            patch.object(data_warehouse.ibis.duckdb, "connect", side_effect=connect_after_lock),
+            patch.object(data_warehouse, "READ_LOCK_RETRY_INTERVAL", 0),
+        ):
+            self.warehouse.db.raw_sql("SELECT 1").fetchall()
+
+        self.assertEqual(len(attempts), 3)
+        self.assertTrue(all(kwargs["read_only"] for kwargs in attempts))
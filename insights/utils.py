@@ -151,6 +151,24 @@ def create_execution_log(sql, time_taken=0, query_name=None):
     ).insert(ignore_permissions=True)
 
 
+def get_view_counts(doctype: str, names: list) -> dict:
+    # returns the number of views of each document, counted in a single query
+    if not names:
+        return {}
+
+    from frappe.query_builder.functions import Count
+
+    ViewLog = frappe.qb.DocType("View Log")
+    view_counts = (
+        frappe.qb.from_(ViewLog)
+        .select(ViewLog.reference_name, Count("*").as_("views"))
+        .where((ViewLog.reference_doctype == doctype) & ViewLog.reference_name.isin(names))
+        .groupby(ViewLog.reference_name)
+        .run()
+    )
+    return {str(name): views for name, views in view_counts}
+
+
 def detect_encoding(file_path: str):
     file_path: pathlib.Path = pathlib.Path(file_path)
     with open(file_path, "rb") as file: